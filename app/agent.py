@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
 import re
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from functools import partial
+from threading import Lock
 from typing import Dict, List, Optional, Tuple
 
 try:
@@ -9,7 +15,24 @@ try:
 except Exception:  # pragma: no cover - optional dependency
     OpenAI = None
 
+try:
+    import httpx
+except Exception:  # pragma: no cover - optional dependency
+    httpx = None
+
+try:
+    import h2  # noqa: F401
+
+    _HTTP2_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency
+    _HTTP2_AVAILABLE = False
+
+from .cache import TTLCache
+from .config import Settings
 from .models import AgentReply, Message, SessionState
+from .templates import render_template_reply
+
+logger = logging.getLogger(__name__)
 
 # Bounded-action design: the LLM can only choose among fixed strategies,
 # and then rephrase a reply. Deterministic templates are the source of truth.
@@ -72,6 +95,92 @@ _SECRET_ASK_PATTERNS = [
 ]
 
 
+# One process-wide client so every LLM call reuses the same keep-alive pool.
+_client = None
+_client_api_key = ""
+_client_lock = Lock()
+_client_options: Dict[str, object] = {
+    "base_url": None,
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+}
+
+
+def configure_client(settings: Settings) -> None:
+    _client_options["base_url"] = settings.openai_base_url or None
+    _client_options["max_connections"] = settings.openai_max_connections
+    _client_options["max_keepalive_connections"] = settings.openai_max_keepalive
+
+
+def _get_client(api_key: str):
+    global _client, _client_api_key
+    if OpenAI is None or not api_key:
+        raise RuntimeError("LLM required but not available")
+
+    with _client_lock:
+        if _client is not None and _client_api_key == api_key:
+            return _client
+        if _client is not None:
+            _client.close()
+
+        http_client = None
+        if httpx is not None:
+            http_client = httpx.Client(
+                http2=_HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=_client_options["max_connections"],
+                    max_keepalive_connections=_client_options["max_keepalive_connections"],
+                ),
+            )
+        _client = OpenAI(
+            api_key=api_key,
+            base_url=_client_options["base_url"],
+            http_client=http_client,
+        )
+        _client_api_key = api_key
+        return _client
+
+
+# Strategy and first-pass reply results, shared across sessions.
+_strategy_cache = TTLCache()
+_reply_cache = TTLCache()
+
+
+def configure_cache(settings: Settings) -> None:
+    _strategy_cache.configure(settings.llm_cache_size, settings.llm_cache_ttl_seconds)
+    _reply_cache.configure(settings.llm_cache_size, settings.llm_cache_ttl_seconds)
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    return {"strategy": _strategy_cache.stats(), "reply": _reply_cache.stats()}
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise RuntimeError("LLM deadline exceeded")
+    return remaining
+
+
+def _client_for(api_key: str, deadline: Optional[float]):
+    client = _get_client(api_key)
+    if deadline is None:
+        return client
+    # Retries would overrun the request budget; the template fallback covers failures.
+    return client.with_options(timeout=_remaining(deadline), max_retries=0)
+
+
+def close_client() -> None:
+    global _client, _client_api_key
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _client_api_key = ""
+
+
 def _normalize_text(text: str) -> str:
     return re.sub(r"[^a-z0-9]+", "", (text or "").lower())
 
@@ -119,16 +228,7 @@ def _parse_json(text: str) -> Optional[dict]:
         return None
 
 
-def _llm_select_strategy(
-    state: SessionState,
-    scammer_text: str,
-    history: List[Message],
-    api_key: str,
-    model: str,
-) -> Optional[str]:
-    if OpenAI is None or not api_key:
-        raise RuntimeError("LLM required but not available")
-
+def _strategy_payload(state: SessionState, scammer_text: str, history: List[Message]) -> dict:
     scammer_msgs, user_msgs = _extract_last_messages(history)
     missing = {
         "upi": "upi" in state.missingSlots,
@@ -137,7 +237,7 @@ def _llm_select_strategy(
         "bank": "bank" in state.missingSlots,
         "suspicious": "suspicious" in state.missingSlots,
     }
-    payload = {
+    return {
         "lastScammerMessages": scammer_msgs,
         "lastHoneypotReplies": user_msgs,
         "extractedIntelligence": state.extractedIntelligence.model_dump(),
@@ -146,6 +246,41 @@ def _llm_select_strategy(
         "scammerMessage": scammer_text,
     }
 
+
+def _reply_style_prompt(early_turn: bool, stress_score_high: bool, safety_note: str = "") -> str:
+    softener = (
+        "Be extra polite and non-confrontational; ask what this is about."
+        if early_turn
+        else "Stay calm, slightly worried, and cautious."
+    )
+    stress_note = "Stress is high; include one emotional cue like 'I'm scared' or 'please'." if stress_score_high else ""
+
+    return (
+        "Reply in 1-2 short lines. Natural Indian English texting, slightly imperfect. "
+        "Over-polished language is undesirable; fragments are okay. "
+        "Early turns can include sir/ma'am, later drop it. "
+        "Never mention scam, fraud, honeypot, AI, or detection. "
+        "Never give safety advice. Never provide OTP/account numbers. "
+        "If OTP/account is asked, respond with safe friction: OTP not received / app asking PIN / error / network. "
+        "If nextIntent is clarify_procedure or pretend_technical_issue, include a short procedural question. "
+        "Keep engagement by confusion/reassurance/friction. "
+        f"{softener} {stress_note} {safety_note} "
+    )
+
+
+def _llm_select_strategy(
+    state: SessionState,
+    scammer_text: str,
+    history: List[Message],
+    api_key: str,
+    model: str,
+    deadline: Optional[float] = None,
+) -> Optional[str]:
+    if OpenAI is None or not api_key:
+        raise RuntimeError("LLM required but not available")
+
+    payload = _strategy_payload(state, scammer_text, history)
+
     system_prompt = (
         "Return JSON only. Select the safest next strategy from the enum.\n"
         "Prefer strategies that extract missing intel: official link/ticket, helpline number, employee ID/branch, UPI handle.\n"
@@ -155,7 +290,7 @@ def _llm_select_strategy(
     )
 
     try:
-        client = OpenAI(api_key=api_key)
+        client = _client_for(api_key, deadline)
         response = client.chat.completions.create(
             model=model,
             messages=[
@@ -178,7 +313,7 @@ def _llm_select_strategy(
     raise RuntimeError("LLM strategy selection returned invalid strategy")
 
 
-def _llm_generate_reply(
+def _llm_generate_replies(
     strategy: str,
     scammer_text: str,
     api_key: str,
@@ -189,33 +324,20 @@ def _llm_generate_reply(
     early_turn: bool = False,
     next_intent: str = "clarify_procedure",
     stress_score_high: bool = False,
-) -> Optional[str]:
+    n: int = 1,
+    deadline: Optional[float] = None,
+) -> List[str]:
     if OpenAI is None or not api_key:
         raise RuntimeError("LLM required but not available")
 
     recent_scammer = (recent_scammer or [])[-3:]
     recent_honeypot = (recent_honeypot or [])[-3:]
 
-    softener = (
-        "Be extra polite and non-confrontational; ask what this is about."
-        if early_turn
-        else "Stay calm, slightly worried, and cautious."
-    )
-    stress_note = "Stress is high; include one emotional cue like 'I'm scared' or 'please'." if stress_score_high else ""
-
     system_prompt = (
         "You are a stressed Indian user replying to a suspicious bank/security message. "
         "Follow the given nextIntent exactly. Only phrase the reply; do not choose strategy. "
-        "Reply in 1-2 short lines. Natural Indian English texting, slightly imperfect. "
-        "Over-polished language is undesirable; fragments are okay. "
-        "Early turns can include sir/ma'am, later drop it. "
-        "Never mention scam, fraud, honeypot, AI, or detection. "
-        "Never give safety advice. Never provide OTP/account numbers. "
-        "If OTP/account is asked, respond with safe friction: OTP not received / app asking PIN / error / network. "
-        "If nextIntent is clarify_procedure or pretend_technical_issue, include a short procedural question. "
-        "Keep engagement by confusion/reassurance/friction. "
-        f"{softener} {stress_note} {safety_note} "
-        "Output ONLY the reply text. No quotes, no JSON."
+        + _reply_style_prompt(early_turn, stress_score_high, safety_note)
+        + "Output ONLY the reply text. No quotes, no JSON."
     )
 
     user_prompt = json.dumps(
@@ -229,7 +351,7 @@ def _llm_generate_reply(
     )
 
     try:
-        client = OpenAI(api_key=api_key)
+        client = _client_for(api_key, deadline)
         response = client.chat.completions.create(
             model=model,
             messages=[
@@ -237,15 +359,77 @@ def _llm_generate_reply(
                 {"role": "user", "content": user_prompt},
             ],
             temperature=0.6,
+            n=n,
         )
-        content = response.choices[0].message.content if response.choices else ""
+        contents = [choice.message.content or "" for choice in response.choices]
     except Exception as exc:
         raise RuntimeError("LLM reply generation failed") from exc
 
-    reply_text = content.strip()
-    if not reply_text:
+    replies = [content.strip() for content in contents if content.strip()]
+    if not replies:
         raise RuntimeError("LLM reply generation returned empty text")
-    return reply_text
+    return replies
+
+
+def _llm_generate_reply(strategy: str, scammer_text: str, api_key: str, model: str, **kwargs) -> str:
+    return _llm_generate_replies(strategy, scammer_text, api_key, model, **kwargs)[0]
+
+
+def _llm_select_and_generate(
+    state: SessionState,
+    scammer_text: str,
+    history: List[Message],
+    api_key: str,
+    model: str,
+    early_turn: bool = False,
+    stress_score_high: bool = False,
+    n: int = 1,
+    deadline: Optional[float] = None,
+) -> List[Tuple[str, str]]:
+    # Fused mode: strategy choice and phrasing in a single structured call.
+    payload = _strategy_payload(state, scammer_text, history)
+    payload["recentHoneypot"] = (getattr(state, "recentHoneypot", []) or [])[-3:]
+    payload["intents"] = _STRATEGY_INTENT
+
+    system_prompt = (
+        "Return JSON only. You are a stressed Indian user replying to a suspicious bank/security message.\n"
+        "First select the safest next strategy from the enum, then write the reply for it; "
+        "the strategy's nextIntent is given in intents.\n"
+        "Prefer strategies that extract missing intel: official link/ticket, helpline number, employee ID/branch, UPI handle.\n"
+        "If scammer demands OTP/PIN/password, choose TECHNICAL_STALL_PIN_ISSUE.\n"
+        "Never choose any strategy that asks for victim secrets.\n"
+        + _reply_style_prompt(early_turn, stress_score_high)
+        + "\nJSON schema: {\"strategy\": <enum>, \"reply\": <reply text>}"
+    )
+
+    try:
+        client = _client_for(api_key, deadline)
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": json.dumps(payload)},
+            ],
+            temperature=0.5,
+            response_format={"type": "json_object"},
+            n=n,
+        )
+        parsed = [_parse_json(choice.message.content or "") for choice in response.choices]
+    except Exception as exc:
+        raise RuntimeError("LLM fused reply failed") from exc
+
+    candidates: List[Tuple[str, str]] = []
+    for data in parsed:
+        if not isinstance(data, dict):
+            continue
+        strategy = data.get("strategy")
+        reply = data.get("reply")
+        if strategy in STRATEGIES and isinstance(reply, str) and reply.strip():
+            candidates.append((strategy, reply.strip()))
+
+    if not candidates:
+        raise RuntimeError("LLM fused reply returned no valid strategy/reply")
+    return candidates
 
 
 def _contains_banned(text: str) -> bool:
@@ -276,35 +460,118 @@ def _asks_for_details(text: str) -> bool:
     return "?" in lowered and any(keyword in lowered for keyword in keywords)
 
 
-def build_agent_reply(
+def _passes_filters(reply: str, last_reply: Optional[str]) -> bool:
+    return (
+        not _asks_for_secret(reply)
+        and not _contains_banned(reply)
+        and _normalize_text(reply) != _normalize_text(last_reply or "")
+        and _asks_for_details(reply)
+    )
+
+
+def _pick_candidate(candidates: List[Tuple[str, str]], last_reply: Optional[str]) -> Tuple[str, str]:
+    # Keep the first candidate that needs no regeneration; otherwise the
+    # sequential cascade below repairs the first one.
+    for strategy, reply in candidates:
+        if _passes_filters(reply, last_reply):
+            return strategy, reply
+    return candidates[0]
+
+
+def _agent_notes(strategy: str) -> str:
+    return (
+        f"Strategy: {strategy}. "
+        "Goal: keep scammer engaged and extract verification details (link/ticket, helpline, UPI handle, ID)."
+    )
+
+
+def build_template_reply(state: SessionState, scammer_text: str) -> AgentReply:
+    strategy = _pick_deterministic_strategy(state, scammer_text)
+    reply = render_template_reply(
+        strategy,
+        state.sessionId,
+        state.totalMessagesExchanged,
+        next_intent=_STRATEGY_INTENT.get(strategy, "clarify_procedure"),
+        early_turn=state.totalMessagesExchanged <= 3,
+        stress_score_high=state.turnsSinceChange >= 1,
+        avoid=[state.lastReply or "", *getattr(state, "recentHoneypot", [])],
+    )
+    should_terminate = bool(getattr(state, "terminated", False))
+    return AgentReply(reply=reply, agentNotes=_agent_notes(strategy), shouldTerminate=should_terminate)
+
+
+def _build_llm_reply(
     state: SessionState,
     scammer_text: str,
     history: List[Message],
     api_key: str,
     model: str,
+    mode: str = "two_stage",
+    candidates: int = 1,
+    deadline: Optional[float] = None,
 ) -> AgentReply:
-    strategy = _llm_select_strategy(state, scammer_text, history, api_key, model)
-
     early_turn = state.totalMessagesExchanged <= 3
-    next_intent = _STRATEGY_INTENT.get(strategy, "clarify_procedure")
     stress_score_high = state.turnsSinceChange >= 1
 
     recent_scammer = getattr(state, "recentScammer", [])
     recent_honeypot = getattr(state, "recentHoneypot", [])
 
-    reply = _llm_generate_reply(
-        strategy,
-        scammer_text,
-        api_key,
-        model,
-        recent_scammer=recent_scammer,
-        recent_honeypot=recent_honeypot,
-        early_turn=early_turn,
-        next_intent=next_intent,
-        stress_score_high=stress_score_high,
-    )
-
-    reply = _limit_sentences(reply, max_sentences=2)
+    # Campaigns replay the same script across sessions, so the first-stage
+    # results are shared; duplicates of this session's lastReply are still
+    # caught by _pick_candidate and the cascade below.
+    text_key = _normalize_text(scammer_text)
+    slots_key = tuple(sorted(state.missingSlots))
+
+    if mode == "fused":
+        fused_key = ("fused", text_key, early_turn, stress_score_high, slots_key)
+        options = _reply_cache.get(fused_key)
+        if options is None:
+            options = tuple(
+                _llm_select_and_generate(
+                    state,
+                    scammer_text,
+                    history,
+                    api_key,
+                    model,
+                    early_turn=early_turn,
+                    stress_score_high=stress_score_high,
+                    n=candidates,
+                    deadline=deadline,
+                )
+            )
+            _reply_cache.set(fused_key, options)
+    else:
+        strategy_key = (text_key, slots_key)
+        strategy = _strategy_cache.get(strategy_key)
+        if strategy is None:
+            strategy = _llm_select_strategy(state, scammer_text, history, api_key, model, deadline=deadline)
+            _strategy_cache.set(strategy_key, strategy)
+
+        next_intent = _STRATEGY_INTENT.get(strategy, "clarify_procedure")
+        reply_key = ("reply", text_key, strategy, next_intent, early_turn, stress_score_high, slots_key)
+        replies = _reply_cache.get(reply_key)
+        if replies is None:
+            replies = tuple(
+                _llm_generate_replies(
+                    strategy,
+                    scammer_text,
+                    api_key,
+                    model,
+                    recent_scammer=recent_scammer,
+                    recent_honeypot=recent_honeypot,
+                    early_turn=early_turn,
+                    next_intent=next_intent,
+                    stress_score_high=stress_score_high,
+                    n=candidates,
+                    deadline=deadline,
+                )
+            )
+            _reply_cache.set(reply_key, replies)
+        options = [(strategy, reply) for reply in replies]
+
+    options = [(strategy, _limit_sentences(reply, max_sentences=2)) for strategy, reply in options]
+    strategy, reply = _pick_candidate(options, state.lastReply)
+    next_intent = _STRATEGY_INTENT.get(strategy, "clarify_procedure")
 
     if _asks_for_secret(reply) or _contains_banned(reply):
         reply = _llm_generate_reply(
@@ -318,6 +585,7 @@ def build_agent_reply(
             early_turn=early_turn,
             next_intent=next_intent,
             stress_score_high=stress_score_high,
+            deadline=deadline,
         )
 
     reply = _limit_sentences(reply, max_sentences=2)
@@ -334,6 +602,7 @@ def build_agent_reply(
             early_turn=early_turn,
             next_intent=_STRATEGY_INTENT.get(alt_strategy, "clarify_procedure"),
             stress_score_high=stress_score_high,
+            deadline=deadline,
         )
         reply = alt_reply
 
@@ -351,15 +620,117 @@ def build_agent_reply(
             early_turn=early_turn,
             next_intent="clarify_procedure",
             stress_score_high=stress_score_high,
+            deadline=deadline,
         )
 
     if _asks_for_secret(reply) or _contains_banned(reply):
         raise RuntimeError("LLM reply violated safety constraints")
 
-    agent_notes = (
-        f"Strategy: {strategy}. "
-        "Goal: keep scammer engaged and extract verification details (link/ticket, helpline, UPI handle, ID)."
-    )
-
     should_terminate = bool(getattr(state, "terminated", False))
-    return AgentReply(reply=reply, agentNotes=agent_notes, shouldTerminate=should_terminate)
+    return AgentReply(reply=reply, agentNotes=_agent_notes(strategy), shouldTerminate=should_terminate)
+
+
+def build_agent_reply(
+    state: SessionState,
+    scammer_text: str,
+    history: List[Message],
+    api_key: str,
+    model: str,
+    mode: str = "two_stage",
+    candidates: int = 1,
+    deadline: Optional[float] = None,
+) -> AgentReply:
+    if OpenAI is None or not api_key:
+        return build_template_reply(state, scammer_text)
+
+    try:
+        return _build_llm_reply(
+            state,
+            scammer_text,
+            history,
+            api_key,
+            model,
+            mode=mode,
+            candidates=candidates,
+            deadline=deadline,
+        )
+    except RuntimeError:
+        logger.warning("LLM reply failed for session %s; using template reply", state.sessionId, exc_info=True)
+        return build_template_reply(state, scammer_text)
+
+
+# Turns currently queued or running on the agent executor. A turn counts
+# until its worker finishes, even after the request stopped waiting for it.
+_pending_turns = 0
+_pending_lock = Lock()
+# Used when the caller passes no executor (the app always passes its own).
+_fallback_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _turn_finished(_future: "Optional[Future[AgentReply]]") -> None:
+    global _pending_turns
+    with _pending_lock:
+        _pending_turns -= 1
+
+
+def _default_executor() -> Executor:
+    global _fallback_executor
+    with _pending_lock:
+        if _fallback_executor is None:
+            _fallback_executor = ThreadPoolExecutor(thread_name_prefix="agent")
+        return _fallback_executor
+
+
+async def build_agent_reply_async(
+    state: SessionState,
+    scammer_text: str,
+    history: List[Message],
+    api_key: str,
+    model: str,
+    mode: str = "two_stage",
+    candidates: int = 1,
+    executor: Optional[Executor] = None,
+    max_pending: int = 0,
+    deadline: Optional[float] = None,
+) -> AgentReply:
+    global _pending_turns
+    if OpenAI is None or not api_key:
+        return build_template_reply(state, scammer_text)
+
+    # Shed load to templates instead of queueing behind a saturated pool.
+    if max_pending and _pending_turns >= max_pending:
+        logger.warning("Agent overloaded (%s pending turns); using template reply", _pending_turns)
+        return build_template_reply(state, scammer_text)
+
+    # The OpenAI calls are blocking; run the whole pipeline on a bounded pool
+    # so a slow LLM turn never stalls the event loop for other sessions.
+    if executor is None:
+        executor = _default_executor()
+    with _pending_lock:
+        _pending_turns += 1
+    try:
+        future = executor.submit(
+            partial(
+                build_agent_reply,
+                state,
+                scammer_text,
+                history,
+                api_key,
+                model,
+                mode=mode,
+                candidates=candidates,
+                deadline=deadline,
+            ),
+        )
+    except BaseException:
+        _turn_finished(None)
+        raise
+    future.add_done_callback(_turn_finished)
+    try:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        # The worker thread sees the same deadline on every LLM call, so an
+        # abandoned turn stops on its own shortly after we stop waiting.
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning("LLM budget exhausted for session %s; using template reply", state.sessionId)
+        return build_template_reply(state, scammer_text)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import itertools
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+
+from .detector import detect_many, detector_state, install_detector_state
+from .extract import extract_many
+from .models import DetectorResult, ExtractionResult
+
+DEFAULT_CHUNK_SIZE = 2048
+
+
+@dataclass
+class DetectionBatch:
+    """Detector results as columns: row ``i`` belongs to the ``i``-th text."""
+
+    scores: List[float] = field(default_factory=list)
+    indicators: List[List[str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def extend(self, scores: List[float], indicators: List[List[str]]) -> None:
+        self.scores.extend(scores)
+        self.indicators.extend(indicators)
+
+    def row(self, index: int) -> DetectorResult:
+        # Per-indicator weights are not kept in batch mode.
+        return DetectorResult(score=self.scores[index], indicators=self.indicators[index])
+
+
+@dataclass
+class ExtractionBatch:
+    """Extraction results as columns, named after ``ExtractionResult`` fields."""
+
+    bankAccounts: List[List[str]] = field(default_factory=list)
+    upiIds: List[List[str]] = field(default_factory=list)
+    phishingLinks: List[List[str]] = field(default_factory=list)
+    phoneNumbers: List[List[str]] = field(default_factory=list)
+    suspiciousKeywords: List[List[str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.bankAccounts)
+
+    def columns(self) -> Tuple[List[List[str]], ...]:
+        return (self.bankAccounts, self.upiIds, self.phishingLinks, self.phoneNumbers, self.suspiciousKeywords)
+
+    def extend(self, *columns: List[List[str]]) -> None:
+        for column, values in zip(self.columns(), columns):
+            column.extend(values)
+
+    def row(self, index: int) -> ExtractionResult:
+        return ExtractionResult(
+            bankAccounts=self.bankAccounts[index],
+            upiIds=self.upiIds[index],
+            phishingLinks=self.phishingLinks[index],
+            phoneNumbers=self.phoneNumbers[index],
+            suspiciousKeywords=self.suspiciousKeywords[index],
+        )
+
+
+def _chunks(texts: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(texts)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _run(
+    work: Callable[[List[str]], Any],
+    texts: Iterable[str],
+    processes: int,
+    chunk_size: int,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Tuple[Any, ...] = (),
+) -> Iterator[Any]:
+    """
+    Apply ``work`` to ``texts`` in chunks and yield the results in order.
+
+    With ``processes`` above 1 the chunks run in a process pool. Only a few
+    chunks per worker are in flight at once, so an iterator over millions of
+    messages is never materialised in memory.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    chunks = _chunks(texts, chunk_size)
+    if processes <= 1:
+        for chunk in chunks:
+            yield work(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=processes, initializer=initializer, initargs=initargs) as executor:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(work, chunk))
+            if len(pending) >= processes * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def detect_scam_intent_batch(
+    texts: Iterable[str], processes: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> DetectionBatch:
+    """
+    Score many messages at once; ``scores[i]`` and ``indicators[i]`` match
+    ``detect_scam_intent(texts[i])``.
+
+    Workers started with ``processes`` receive the parent's active lexicon
+    and classifier, so they score with the same tiers as this process.
+    """
+    batch = DetectionBatch()
+    for scores, indicators in _run(
+        detect_many, texts, processes, chunk_size, install_detector_state, (detector_state(),)
+    ):
+        batch.extend(scores, indicators)
+    return batch
+
+
+def extract_intelligence_batch(
+    texts: Iterable[str], processes: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> ExtractionBatch:
+    batch = ExtractionBatch()
+    for columns in _run(extract_many, texts, processes, chunk_size):
+        batch.extend(*columns)
+    return batch
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import time
+from threading import Lock
+from typing import Dict, Union
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Opens after ``failure_threshold`` failures in a row and rejects calls for
+    ``reset_timeout`` seconds. It then half-opens and lets up to
+    ``half_open_max_calls`` probes through. A successful probe closes the
+    circuit, and a failed one opens it again. A probe that reports neither
+    within ``reset_timeout`` is presumed lost and frees its slot.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, half_open_max_calls: int = 1) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._lock = Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probed_at = 0.0
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        now = time.monotonic()
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        elif self._state == HALF_OPEN and self._probes and now - self._probed_at >= self.reset_timeout:
+            self._probes = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                self._probed_at = time.monotonic()
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self) -> float:
+        # Seconds until allow() can pass again: the rest of the open period,
+        # or, while every probe is out, until they count as lost. A probe
+        # that reports back sooner ends the wait early.
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == OPEN:
+                return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            if self._state == HALF_OPEN and self._probes >= self.half_open_max_calls:
+                return max(0.0, self.reset_timeout - (time.monotonic() - self._probed_at))
+            return 0.0
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def stats(self) -> Dict[str, Union[str, int]]:
+        with self._lock:
+            self._maybe_half_open()
+            return {
+                "state": self._state,
+                "consecutiveFailures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
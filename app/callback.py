@@ -1,25 +1,35 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-import requests
+from typing import List, Optional, Sequence
+
+import httpx
 
 from .config import Settings
-from .models import FinalCallbackPayload, SessionState
+from .models import FinalCallbackPayload, Intelligence, SessionState
 
 logger = logging.getLogger(__name__)
 
 
-def send_final_callback(state: SessionState, settings: Settings) -> bool:
-    payload = FinalCallbackPayload(
+def build_final_payload(state: SessionState) -> FinalCallbackPayload:
+    return FinalCallbackPayload(
         sessionId=state.sessionId,
         scamDetected=bool(state.scamConfirmed),  # ✅ honest
         totalMessagesExchanged=state.totalMessagesExchanged,
-        extractedIntelligence=state.extractedIntelligence,
+        # merge_extraction hands back an ExtractionResult; coerce to the wire model
+        extractedIntelligence=Intelligence.model_validate(state.extractedIntelligence.model_dump()),
         agentNotes=state.agentNotes or _build_agent_notes(state),
     )
 
+
+async def send_final_callback(
+    payload: FinalCallbackPayload,
+    settings: Settings,
+    client: httpx.AsyncClient,
+) -> bool:
     try:
-        response = requests.post(
+        response = await client.post(
             settings.callback_url,
             json=payload.model_dump(),
             headers={"Content-Type": "application/json"},
@@ -28,12 +38,77 @@ def send_final_callback(state: SessionState, settings: Settings) -> bool:
         if 200 <= response.status_code < 300:
             return True
         logger.warning("Final callback failed with status %s", response.status_code)
-    except requests.RequestException:
+    except httpx.HTTPError:
         logger.exception("Final callback request failed")
 
     return False
 
 
+async def send_final_callback_batch(
+    payloads: Sequence[FinalCallbackPayload],
+    settings: Settings,
+    client: httpx.AsyncClient,
+    slots: Optional[asyncio.Semaphore] = None,
+) -> List[bool]:
+    """
+    Deliver several payloads at once and report success per item.
+
+    With ``callback_batch_url`` set, the payloads are POSTed as one JSON array.
+    A 2xx response with an empty or non-JSON body acknowledges every item. A
+    JSON body must carry the results, either as
+    ``{"results": [{"sessionId": ..., "ok": bool}, ...]}`` or as that list
+    itself, and only the sessions marked ok count as delivered. Without a bulk endpoint the
+    payloads are pipelined to ``callback_url`` over the shared keep-alive
+    client, at most ``callback_max_inflight`` at a time; pass ``slots`` to
+    share that limit between concurrent batches.
+    """
+    if not payloads:
+        return []
+
+    if not settings.callback_batch_url:
+        # The client pool holds callback_max_inflight connections; posts beyond
+        # that would queue for one and could fail on the pool timeout.
+        if slots is None:
+            slots = asyncio.Semaphore(settings.callback_max_inflight)
+
+        async def send(payload: FinalCallbackPayload) -> bool:
+            async with slots:
+                return await send_final_callback(payload, settings, client)
+
+        return list(await asyncio.gather(*(send(payload) for payload in payloads)))
+
+    try:
+        response = await client.post(
+            settings.callback_batch_url,
+            json=[payload.model_dump() for payload in payloads],
+            headers={"Content-Type": "application/json"},
+            timeout=settings.http_timeout_seconds,
+        )
+    except httpx.HTTPError:
+        logger.exception("Batched final callback request failed")
+        return [False] * len(payloads)
+
+    if not 200 <= response.status_code < 300:
+        logger.warning("Batched final callback failed with status %s", response.status_code)
+        return [False] * len(payloads)
+
+    if not response.content.strip():
+        return [True] * len(payloads)
+    try:
+        body = response.json()
+    except ValueError:
+        return [True] * len(payloads)
+    # Any JSON body must report results; anything unrecognised acks nothing,
+    # so the items are retried rather than lost.
+    items = body.get("results") if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        logger.warning("Batched final callback returned no per-item results; retrying the batch")
+        return [False] * len(payloads)
+
+    acked = {item.get("sessionId") for item in items if isinstance(item, dict) and item.get("ok")}
+    return [payload.sessionId in acked for payload in payloads]
+
+
 def _build_agent_notes(state: SessionState) -> str:
     details = []
     if state.extractedIntelligence.phishingLinks:
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import random
+import sys
+import zipfile
+import zlib
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .models import DetectorResult
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_VERSION = 1
+_PRIME = 1099511628211
+_MIX = 0x9E3779B97F4A7C15
+_WORD_SEED = 0x5BD1E995
+_BIGRAM_SEED = 0x27D4EB2F165667C5
+
+if np is not None:
+    # ASCII letters, digits and underscore, plus every non-ASCII byte so
+    # UTF-8 encoded words in other scripts stay whole.
+    _WORD_BYTES = np.zeros(256, dtype=bool)
+    for _char in b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_":
+        _WORD_BYTES[_char] = True
+    _WORD_BYTES[0x80:] = True
+    _MIX_U64 = np.uint64(_MIX)
+    _WORD_SEED_U64 = np.uint64(_WORD_SEED)
+    _BIGRAM_SEED_U64 = np.uint64(_BIGRAM_SEED)
+    # One tuple, replaced whole, so threads never pair tables of different sizes.
+    _tables = (np.ones(1, dtype=np.uint64), np.ones(1, dtype=np.uint64))
+
+
+def _power_tables(length: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    # P ** k and P ** -k modulo 2 ** 64 (P is odd, so it has an inverse).
+    global _tables
+    tables = _tables
+    if len(tables[0]) < length:
+        size = max(length, 2 * len(tables[0]), 1024)
+        exponents = range(size)
+        powers = np.array([pow(_PRIME, k, 1 << 64) for k in exponents], dtype=np.uint64)
+        inverse = pow(_PRIME, -1, 1 << 64)
+        inverse_powers = np.array([pow(inverse, k, 1 << 64) for k in exponents], dtype=np.uint64)
+        tables = _tables = (powers, inverse_powers)
+    return tables
+
+
+class LinearClassifier:
+    """
+    Logistic regression over hashed character and word n-grams.
+
+    Each text is lowercased and mapped to feature indices: character
+    n-grams plus word unigrams and bigrams. All of them are substrings, so
+    one prefix array of a polynomial hash modulo 2 ** 64 gives every
+    feature's hash in a few vectorized operations, without a Python-level
+    loop over characters or tokens. Hashes are folded into
+    ``2 ** hash_bits`` slots.
+    A text's logit is the bias plus its features' weights, scaled by 1/sqrt
+    of the feature count so long messages do not saturate. ``score_batch``
+    gathers and sums the weights for many texts in one vectorized step.
+    """
+
+    def __init__(
+        self,
+        weights: "np.ndarray",
+        bias: float,
+        hash_bits: int,
+        char_ngrams: Sequence[int] = (3, 4, 5),
+        threshold: float = 0.5,
+    ) -> None:
+        if np is None:
+            raise RuntimeError("numpy is required for the classifier")
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.hash_bits = hash_bits
+        self.char_ngrams = tuple(int(n) for n in char_ngrams)
+        self.threshold = threshold
+        self._ngram_seeds = tuple(np.uint64(n) for n in self.char_ngrams)
+        self._shift = np.uint64(64 - hash_bits)
+        if self.weights.shape != (1 << hash_bits,):
+            raise ValueError("weights do not match hash_bits")
+
+    @classmethod
+    def load(cls, path: str) -> "LinearClassifier":
+        if np is None:
+            raise RuntimeError("numpy is required for the classifier")
+        # A truncated or foreign file fails inside numpy or zipfile with
+        # assorted errors; report them all as an unreadable model.
+        try:
+            with np.load(path) as data:
+                if int(data["format_version"]) != _FORMAT_VERSION:
+                    raise ValueError(f"{path}: unsupported classifier format")
+                return cls(
+                    weights=data["weights"],
+                    bias=float(data["bias"]),
+                    hash_bits=int(data["hash_bits"]),
+                    char_ngrams=data["char_ngrams"].tolist(),
+                    threshold=float(data["threshold"]),
+                )
+        except (zipfile.BadZipFile, zlib.error, EOFError, KeyError, TypeError, AttributeError) as exc:
+            raise ValueError(f"{path}: unreadable classifier ({exc})") from exc
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            format_version=np.int64(_FORMAT_VERSION),
+            weights=self.weights,
+            bias=np.float64(self.bias),
+            hash_bits=np.int64(self.hash_bits),
+            char_ngrams=np.array(self.char_ngrams, dtype=np.int64),
+            threshold=np.float64(self.threshold),
+        )
+
+    def features(self, normalized: str) -> "np.ndarray":
+        data = np.frombuffer(f" {normalized} ".encode("utf-8"), dtype=np.uint8)
+        length = len(data)
+        powers, inverse_powers = _power_tables(length)
+        # prefix[j] - prefix[i] scaled by P ** (j - 1) is the hash of data[i:j].
+        prefix = np.zeros(length + 1, dtype=np.uint64)
+        np.cumsum(data.astype(np.uint64) * inverse_powers[:length], out=prefix[1:])
+        parts = []
+        for n, seed in zip(self.char_ngrams, self._ngram_seeds):
+            if length >= n:
+                # Slices, not index arrays: every n-gram ending at n..length.
+                parts.append(powers[n - 1 : length] * (prefix[n:] - prefix[:-n]) + seed)
+        # The padding guarantees a non-word byte before the first word and
+        # after the last, so starts and ends pair up.
+        is_word = _WORD_BYTES[data]
+        starts = np.flatnonzero(is_word[1:] > is_word[:-1]) + 1
+        if len(starts):
+            ends = np.flatnonzero(is_word[:-1] > is_word[1:]) + 1
+            end_powers = powers[ends - 1]
+            end_prefix = prefix[ends]
+            parts.append(end_powers * (end_prefix - prefix[starts]) + _WORD_SEED_U64)
+            if len(starts) > 1:
+                # Bigram spans run from one word's start to the next word's end.
+                parts.append(end_powers[1:] * (end_prefix[1:] - prefix[starts[:-1]]) + _BIGRAM_SEED_U64)
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        hashed = np.concatenate(parts) * _MIX_U64
+        return (hashed >> self._shift).astype(np.int64)
+
+    def score(self, text: str) -> float:
+        indices = self.features((text or "").lower())
+        if not len(indices):
+            return _sigmoid(self.bias)
+        total = float(self.weights[indices].sum(dtype=np.float64))
+        return _sigmoid(self.bias + total / np.sqrt(len(indices)))
+
+    def score_batch(self, texts: Iterable[str], lowered: bool = False) -> "np.ndarray":
+        indices, segments, counts = _featurize(self, texts, lowered)
+        return _sigmoid(self.bias + _segment_sums(self.weights, indices, segments, counts) / np.sqrt(np.maximum(counts, 1)))
+
+    def detect(self, text: str) -> DetectorResult:
+        probability = self.score(text)
+        indicators = ["classifier"] if probability >= self.threshold else []
+        weights = {"classifier": probability} if indicators else {}
+        return DetectorResult(score=probability, indicators=indicators, weights=weights)
+
+
+def _sigmoid(value):
+    if isinstance(value, np.ndarray):
+        return 1.0 / (1.0 + np.exp(-np.clip(value, -35.0, 35.0)))
+    return 1.0 / (1.0 + math.exp(-max(-35.0, min(35.0, value))))
+
+
+def _featurize(
+    model: LinearClassifier, texts: Iterable[str], lowered: bool = False
+) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    if lowered:
+        per_text = [model.features(text) for text in texts]
+    else:
+        per_text = [model.features((text or "").lower()) for text in texts]
+    counts = np.fromiter((len(indices) for indices in per_text), np.int64, len(per_text))
+    indices = np.concatenate(per_text) if per_text else np.empty(0, dtype=np.int64)
+    segments = np.repeat(np.arange(len(per_text)), counts)
+    return indices, segments, counts
+
+
+def _segment_sums(weights: "np.ndarray", indices: "np.ndarray", segments: "np.ndarray", counts: "np.ndarray") -> "np.ndarray":
+    return np.bincount(segments, weights=weights[indices], minlength=len(counts))
+
+
+def _read_corpus(path: str) -> Tuple[List[str], List[int]]:
+    texts: List[str] = []
+    labels: List[int] = []
+    with open(path, "r", encoding="utf-8") as handle:
+        for number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            label = row.get("label")
+            if isinstance(label, str):
+                label = label.strip().lower() in ("1", "true", "scam", "spam")
+            if label is None or "text" not in row:
+                raise ValueError(f"{path}:{number}: expected 'text' and 'label'")
+            texts.append(str(row["text"]))
+            labels.append(1 if label else 0)
+    return texts, labels
+
+
+def train(
+    texts: Sequence[str],
+    labels: Sequence[int],
+    hash_bits: int = 18,
+    char_ngrams: Sequence[int] = (3, 4, 5),
+    epochs: int = 8,
+    learning_rate: float = 0.5,
+    l2: float = 1e-6,
+    batch_size: int = 256,
+    seed: int = 0,
+) -> LinearClassifier:
+    """Fit the weights with mini-batch Adagrad on L2-regularized log loss."""
+    if np is None:
+        raise RuntimeError("numpy is required to train the classifier")
+    model = LinearClassifier(np.zeros(1 << hash_bits, dtype=np.float32), 0.0, hash_bits, char_ngrams)
+    features = [model.features((text or "").lower()) for text in texts]
+    targets = np.asarray(labels, dtype=np.float64)
+    weights = np.zeros(1 << hash_bits, dtype=np.float64)
+    # Adagrad accumulators: rare n-grams keep a large step size.
+    squared = np.zeros_like(weights)
+    bias = 0.0
+    bias_squared = 0.0
+    order = list(range(len(features)))
+    rng = random.Random(seed)
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        loss = 0.0
+        for start in range(0, len(order), batch_size):
+            batch = order[start : start + batch_size]
+            counts = np.fromiter((len(features[i]) for i in batch), np.int64, len(batch))
+            indices = np.concatenate([features[i] for i in batch])
+            segments = np.repeat(np.arange(len(batch)), counts)
+            scale = 1.0 / np.sqrt(np.maximum(counts, 1))
+            probabilities = _sigmoid(bias + _segment_sums(weights, indices, segments, counts) * scale)
+            y = targets[batch]
+            loss += float(-(y * np.log(probabilities + 1e-12) + (1 - y) * np.log(1 - probabilities + 1e-12)).sum())
+            error = (probabilities - y) / len(batch)
+            touched = np.unique(indices)
+            gradient = np.bincount(indices, weights=(error * scale)[segments], minlength=len(weights))[touched]
+            gradient += l2 * weights[touched]
+            squared[touched] += gradient * gradient
+            weights[touched] -= learning_rate * gradient / (np.sqrt(squared[touched]) + 1e-8)
+            bias_gradient = float(error.sum())
+            bias_squared += bias_gradient * bias_gradient
+            bias -= learning_rate * bias_gradient / (math.sqrt(bias_squared) + 1e-8)
+        logger.info("epoch %s log loss %.4f", epoch + 1, loss / max(1, len(order)))
+    model.weights = weights.astype(np.float32)
+    model.bias = bias
+    return model
+
+
+def _accuracy(model: LinearClassifier, texts: Sequence[str], labels: Sequence[int]) -> float:
+    if not texts:
+        return float("nan")
+    predicted = model.score_batch(texts) >= model.threshold
+    return float((predicted == np.asarray(labels, dtype=bool)).mean())
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.classifier", description="Train or evaluate the scam classifier.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_cmd = commands.add_parser("train", help="fit a model on a labeled JSONL corpus")
+    train_cmd.add_argument("corpus", help='JSONL rows like {"text": "...", "label": 1}')
+    train_cmd.add_argument("model", help="output .npz path")
+    train_cmd.add_argument("--hash-bits", type=int, default=18)
+    train_cmd.add_argument("--char-ngrams", default="3,4,5")
+    train_cmd.add_argument("--epochs", type=int, default=8)
+    train_cmd.add_argument("--learning-rate", type=float, default=0.5)
+    train_cmd.add_argument("--l2", type=float, default=1e-6)
+    train_cmd.add_argument("--holdout", type=float, default=0.1, help="share of rows kept for evaluation")
+    train_cmd.add_argument("--seed", type=int, default=0)
+    eval_cmd = commands.add_parser("evaluate", help="report accuracy of a model on a labeled JSONL corpus")
+    eval_cmd.add_argument("model")
+    eval_cmd.add_argument("corpus")
+    args = parser.parse_args(argv)
+
+    if args.command == "evaluate":
+        model = LinearClassifier.load(args.model)
+        texts, labels = _read_corpus(args.corpus)
+        print(f"accuracy {_accuracy(model, texts, labels):.4f} on {len(texts)} rows")
+        return
+
+    if not 0 <= args.holdout < 1:
+        train_cmd.error("--holdout must be at least 0 and below 1")
+    texts, labels = _read_corpus(args.corpus)
+    rows = list(zip(texts, labels))
+    random.Random(args.seed).shuffle(rows)
+    held = int(len(rows) * args.holdout)
+    train_rows, holdout_rows = rows[held:], rows[:held]
+    if not train_rows:
+        train_cmd.error(f"{args.corpus} leaves no rows to train on")
+    model = train(
+        [text for text, _ in train_rows],
+        [label for _, label in train_rows],
+        hash_bits=args.hash_bits,
+        char_ngrams=[int(n) for n in args.char_ngrams.split(",") if n],
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+        l2=args.l2,
+        seed=args.seed,
+    )
+    model.save(args.model)
+    print(f"trained on {len(train_rows)} rows, saved {args.model}")
+    print(f"train accuracy {_accuracy(model, *zip(*train_rows)):.4f}")
+    if holdout_rows:
+        print(f"holdout accuracy {_accuracy(model, *zip(*holdout_rows)):.4f} on {len(holdout_rows)} rows")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    main()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from enum import IntFlag
+from typing import Optional, Tuple
+
+from .models import Intelligence, ScoreEvent, SessionState
+
+
+class Flag(IntFlag):
+    SCAM_CONFIRMED = 1
+    AGENT_ACTIVE = 2
+    TERMINATED = 4
+    CALLBACK_SENT = 8
+    CALLBACK_DELIVERED = 16
+
+
+class Slot(IntFlag):
+    UPI = 1
+    PHONE = 2
+    PHISHING = 4
+    BANK = 8
+    SUSPICIOUS = 16
+
+
+# missingSlots is always built in this order, so a bit set round-trips it.
+_SLOT_NAMES: Tuple[Tuple[str, int], ...] = (
+    ("upi", Slot.UPI),
+    ("phone", Slot.PHONE),
+    ("phishing", Slot.PHISHING),
+    ("bank", Slot.BANK),
+    ("suspicious", Slot.SUSPICIOUS),
+)
+_SLOT_BITS = dict(_SLOT_NAMES)
+
+_FLAG_FIELDS: Tuple[Tuple[str, int], ...] = (
+    ("scamConfirmed", Flag.SCAM_CONFIRMED),
+    ("agentActive", Flag.AGENT_ACTIVE),
+    ("terminated", Flag.TERMINATED),
+    ("finalCallbackSent", Flag.CALLBACK_SENT),
+    ("finalCallbackDelivered", Flag.CALLBACK_DELIVERED),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class CompactSession:
+    """
+    Stored form of a ``SessionState``.
+
+    Booleans and ``missingSlots`` are packed into int bit sets, lists become
+    tuples (empty ones share the interpreter's singleton), and suspicious
+    keywords and detector indicators are interned because every session
+    draws them from the same small vocabulary. ``to_compact`` and ``from_compact`` convert losslessly.
+    """
+
+    session_id: str
+    flags: int
+    missing: int
+    scam_score: float
+    messages: int
+    turns_since_change: int
+    last_reply: Optional[str]
+    last_scammer_message: Optional[str]
+    agent_notes: str
+    bank_accounts: Tuple[str, ...]
+    upi_ids: Tuple[str, ...]
+    phishing_links: Tuple[str, ...]
+    phone_numbers: Tuple[str, ...]
+    suspicious_keywords: Tuple[str, ...]
+    recent_scammer: Tuple[str, ...]
+    recent_honeypot: Tuple[str, ...]
+    # (indicator, messages, weight) and (turn, score, session score, indicators)
+    indicators: Tuple[Tuple[str, int, float], ...]
+    timeline: Tuple[Tuple[int, float, float, Tuple[str, ...]], ...]
+
+    def has(self, flag: Flag) -> bool:
+        return bool(self.flags & flag)
+
+
+def to_compact(state: SessionState) -> CompactSession:
+    flags = 0
+    for name, bit in _FLAG_FIELDS:
+        if getattr(state, name):
+            flags |= bit
+    missing = 0
+    for slot in state.missingSlots:
+        missing |= _SLOT_BITS[slot]
+    intel = state.extractedIntelligence
+    return CompactSession(
+        session_id=state.sessionId,
+        flags=int(flags),
+        missing=int(missing),
+        scam_score=state.scamScore,
+        messages=state.totalMessagesExchanged,
+        turns_since_change=state.turnsSinceChange,
+        last_reply=state.lastReply,
+        last_scammer_message=state.lastScammerMessage,
+        agent_notes=state.agentNotes,
+        bank_accounts=tuple(intel.bankAccounts),
+        upi_ids=tuple(intel.upiIds),
+        phishing_links=tuple(intel.phishingLinks),
+        phone_numbers=tuple(intel.phoneNumbers),
+        suspicious_keywords=tuple(sys.intern(keyword) for keyword in intel.suspiciousKeywords),
+        recent_scammer=tuple(state.recentScammer),
+        recent_honeypot=tuple(state.recentHoneypot),
+        indicators=tuple(
+            (sys.intern(indicator), count, state.indicatorWeights.get(indicator, 0.0))
+            for indicator, count in state.indicatorCounts.items()
+        ),
+        timeline=tuple(
+            (event.turn, event.score, event.sessionScore, tuple(sys.intern(name) for name in event.indicators))
+            for event in state.scoreTimeline
+        ),
+    )
+
+
+def from_compact(compact: CompactSession) -> SessionState:
+    # Values were validated when the state was compacted, so skip validation.
+    flags = compact.flags
+    return SessionState.model_construct(
+        sessionId=compact.session_id,
+        scamScore=compact.scam_score,
+        scamConfirmed=bool(flags & Flag.SCAM_CONFIRMED),
+        agentActive=bool(flags & Flag.AGENT_ACTIVE),
+        totalMessagesExchanged=compact.messages,
+        lastReply=compact.last_reply,
+        turnsSinceChange=compact.turns_since_change,
+        terminated=bool(flags & Flag.TERMINATED),
+        finalCallbackSent=bool(flags & Flag.CALLBACK_SENT),
+        finalCallbackDelivered=bool(flags & Flag.CALLBACK_DELIVERED),
+        extractedIntelligence=Intelligence.model_construct(
+            bankAccounts=list(compact.bank_accounts),
+            upiIds=list(compact.upi_ids),
+            phishingLinks=list(compact.phishing_links),
+            phoneNumbers=list(compact.phone_numbers),
+            suspiciousKeywords=list(compact.suspicious_keywords),
+        ),
+        lastScammerMessage=compact.last_scammer_message,
+        agentNotes=compact.agent_notes,
+        missingSlots=[name for name, bit in _SLOT_NAMES if compact.missing & bit],
+        recentScammer=list(compact.recent_scammer),
+        recentHoneypot=list(compact.recent_honeypot),
+        indicatorCounts={indicator: count for indicator, count, _ in compact.indicators},
+        indicatorWeights={indicator: weight for indicator, _, weight in compact.indicators},
+        scoreTimeline=[
+            ScoreEvent.model_construct(turn=turn, score=score, sessionScore=session_score, indicators=list(names))
+            for turn, score, session_score, names in compact.timeline
+        ],
+    )
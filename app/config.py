@@ -1,70 +1,16 @@
 from __future__ import annotations
 
 import os
-import re
 from dataclasses import dataclass
-from typing import List
+
+# Re-exported: the detector used to be duplicated here.
+from .detector import detect_scam_intent  # noqa: F401
 
 try:
     from dotenv import load_dotenv
 except Exception:
     load_dotenv = None
 
-from .models import DetectorResult
-
-_SCAM_KEYWORDS = {
-    "urgent": 0.22,
-    "immediately": 0.15,
-    "verify": 0.18,
-    "verification": 0.12,
-    "account blocked": 0.22,
-    "account": 0.08,
-    "suspended": 0.16,
-    "blocked": 0.16,
-    "kyc": 0.18,
-    "otp": 0.2,
-    "password": 0.12,
-    "bank": 0.08,
-    "fraud prevention team": 0.22,
-    "customer care": 0.18,
-    "police": 0.2,
-    "court": 0.2,
-    "fine": 0.15,
-    "penalty": 0.12,
-    "payment": 0.08,
-    "transfer": 0.1,
-    "upi": 0.18,
-    "gift card": 0.18,
-    "bitcoin": 0.2,
-    "crypto": 0.15,
-    "wire": 0.1,
-}
-
-_URL_PATTERN = re.compile(r"https?://\S+", re.IGNORECASE)
-_PHONE_PATTERN = re.compile(r"(?:\+?\d[\d\s\-]{7,}\d)")
-
-
-def detect_scam_intent(text: str) -> DetectorResult:
-    normalized = (text or "").lower()
-    indicators: List[str] = []
-    score = 0.0
-
-    for keyword, weight in _SCAM_KEYWORDS.items():
-        if keyword in normalized:
-            indicators.append(keyword)
-            score += weight
-
-    if _URL_PATTERN.search(normalized):
-        indicators.append("url")
-        score += 0.2
-
-    if _PHONE_PATTERN.search(normalized):
-        indicators.append("phone")
-        score += 0.1
-
-    score = min(score, 1.0)
-    return DetectorResult(score=score, indicators=sorted(set(indicators)))
-
 
 @dataclass(frozen=True)
 class Settings:
@@ -74,8 +20,40 @@ class Settings:
     callback_url: str
     http_timeout_seconds: float
     persona_name: str
+    session_store_shards: int
+    session_ttl_seconds: float
+    session_max_count: int
+    session_backend: str
+    session_db_path: str
+    session_flush_interval_ms: int
+    session_flush_batch_size: int
+    session_snapshot_path: str
     openai_api_key: str
     openai_model: str
+    openai_base_url: str
+    openai_max_connections: int
+    openai_max_keepalive: int
+    agent_max_workers: int
+    agent_mode: str
+    agent_candidates: int
+    agent_max_pending: int
+    request_budget_seconds: float
+    llm_cache_size: int
+    llm_cache_ttl_seconds: float
+    lexicon_dir: str
+    classifier_path: str
+    classifier_weight: float
+    lexicon_reload_seconds: float
+    outbox_path: str
+    callback_max_attempts: int
+    callback_backoff_base_seconds: float
+    callback_backoff_max_seconds: float
+    callback_breaker_threshold: int
+    callback_breaker_reset_seconds: float
+    callback_max_inflight: int
+    callback_batch_size: int
+    callback_batch_window_ms: int
+    callback_batch_url: str
 
 
 def load_settings() -> Settings:
@@ -95,9 +73,45 @@ def load_settings() -> Settings:
     )
 
     http_timeout_seconds = float(os.environ.get("CALLBACK_TIMEOUT", os.environ.get("HTTP_TIMEOUT_SECONDS", "5")))
+    lexicon_dir = os.environ.get("LEXICON_DIR", "")
+    classifier_path = os.environ.get("CLASSIFIER_PATH", "")
+    classifier_weight = max(0.0, float(os.environ.get("CLASSIFIER_WEIGHT", "0.5")))
+    lexicon_reload_seconds = max(0.0, float(os.environ.get("LEXICON_RELOAD_SECONDS", "30")))
+    outbox_path = os.environ.get("OUTBOX_PATH", "outbox.db")
+    callback_max_attempts = max(1, int(os.environ.get("CALLBACK_MAX_ATTEMPTS", "8")))
+    callback_backoff_base_seconds = float(os.environ.get("CALLBACK_BACKOFF_BASE_SECONDS", "1"))
+    callback_backoff_max_seconds = float(os.environ.get("CALLBACK_BACKOFF_MAX_SECONDS", "300"))
+    callback_breaker_threshold = max(1, int(os.environ.get("CALLBACK_BREAKER_THRESHOLD", "5")))
+    callback_breaker_reset_seconds = float(os.environ.get("CALLBACK_BREAKER_RESET_SECONDS", "30"))
+    callback_max_inflight = max(1, int(os.environ.get("CALLBACK_MAX_INFLIGHT", "4")))
+    callback_batch_size = max(1, int(os.environ.get("CALLBACK_BATCH_SIZE", "1")))
+    callback_batch_window_ms = max(0, int(os.environ.get("CALLBACK_BATCH_WINDOW_MS", "200")))
+    callback_batch_url = os.environ.get("CALLBACK_BATCH_URL", "")
     persona_name = os.environ.get("PERSONA_NAME", "Sam")
+    session_store_shards = max(1, int(os.environ.get("SESSION_STORE_SHARDS", "16")))
+    session_ttl_seconds = max(0.0, float(os.environ.get("SESSION_TTL_SECONDS", "3600")))
+    session_max_count = max(0, int(os.environ.get("SESSION_MAX_COUNT", "100000")))
+    session_backend = os.environ.get("SESSION_BACKEND", "memory").strip().lower()
+    if session_backend not in ("memory", "sqlite", "shared"):
+        raise RuntimeError("SESSION_BACKEND must be 'memory', 'sqlite' or 'shared'")
+    session_db_path = os.environ.get("SESSION_DB_PATH", "sessions.db")
+    session_flush_interval_ms = max(0, int(os.environ.get("SESSION_FLUSH_INTERVAL_MS", "50")))
+    session_flush_batch_size = max(1, int(os.environ.get("SESSION_FLUSH_BATCH_SIZE", "256")))
+    session_snapshot_path = os.environ.get("SESSION_SNAPSHOT_PATH", "")
     openai_api_key = os.environ.get("OPENAI_API_KEY", "")
     openai_model = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+    openai_base_url = os.environ.get("OPENAI_BASE_URL", "")
+    openai_max_connections = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "20"))
+    openai_max_keepalive = int(os.environ.get("OPENAI_MAX_KEEPALIVE", "10"))
+    agent_max_workers = max(1, int(os.environ.get("AGENT_MAX_WORKERS", "8")))
+    agent_mode = os.environ.get("AGENT_MODE", "two_stage").strip().lower()
+    if agent_mode not in ("two_stage", "fused"):
+        raise RuntimeError("AGENT_MODE must be 'two_stage' or 'fused'")
+    agent_max_pending = max(0, int(os.environ.get("AGENT_MAX_PENDING", "32")))
+    request_budget_seconds = float(os.environ.get("REQUEST_BUDGET_SECONDS", "8"))
+    llm_cache_size = max(0, int(os.environ.get("LLM_CACHE_SIZE", "1024")))
+    llm_cache_ttl_seconds = float(os.environ.get("LLM_CACHE_TTL_SECONDS", "600"))
+    agent_candidates = min(8, max(1, int(os.environ.get("AGENT_CANDIDATES", "1"))))
 
     return Settings(
         api_key=api_key,
@@ -106,6 +120,38 @@ def load_settings() -> Settings:
         callback_url=callback_url,
         http_timeout_seconds=http_timeout_seconds,
         persona_name=persona_name,
+        session_store_shards=session_store_shards,
+        session_ttl_seconds=session_ttl_seconds,
+        session_max_count=session_max_count,
+        session_backend=session_backend,
+        session_db_path=session_db_path,
+        session_flush_interval_ms=session_flush_interval_ms,
+        session_flush_batch_size=session_flush_batch_size,
+        session_snapshot_path=session_snapshot_path,
         openai_api_key=openai_api_key,
         openai_model=openai_model,
+        openai_base_url=openai_base_url,
+        openai_max_connections=openai_max_connections,
+        openai_max_keepalive=openai_max_keepalive,
+        agent_max_workers=agent_max_workers,
+        agent_mode=agent_mode,
+        agent_candidates=agent_candidates,
+        agent_max_pending=agent_max_pending,
+        request_budget_seconds=request_budget_seconds,
+        llm_cache_size=llm_cache_size,
+        llm_cache_ttl_seconds=llm_cache_ttl_seconds,
+        lexicon_dir=lexicon_dir,
+        classifier_path=classifier_path,
+        classifier_weight=classifier_weight,
+        lexicon_reload_seconds=lexicon_reload_seconds,
+        outbox_path=outbox_path,
+        callback_max_attempts=callback_max_attempts,
+        callback_backoff_base_seconds=callback_backoff_base_seconds,
+        callback_backoff_max_seconds=callback_backoff_max_seconds,
+        callback_breaker_threshold=callback_breaker_threshold,
+        callback_breaker_reset_seconds=callback_breaker_reset_seconds,
+        callback_max_inflight=callback_max_inflight,
+        callback_batch_size=callback_batch_size,
+        callback_batch_window_ms=callback_batch_window_ms,
+        callback_batch_url=callback_batch_url,
     )
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import logging
 import re
-from typing import List
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from .models import DetectorResult
+from .lexicon import Lexicon, Signature, build_lexicon, directory_signature, load_pack, make_pack, pack_paths
+from .models import DetectorResult, ScoreEvent, SessionState
+
+logger = logging.getLogger(__name__)
 
 
 _SCAM_KEYWORDS = {
@@ -34,27 +39,209 @@ _SCAM_KEYWORDS = {
     "wire": 0.1,
 }
 
+_BUILTIN_PACK = make_pack("builtin", "1", _SCAM_KEYWORDS)
+
+# Requests read this reference once per call; reloads replace it whole, so a
+# request never sees a half-built lexicon and never waits for a rebuild.
+_lexicon: Lexicon = build_lexicon([_BUILTIN_PACK])
+_reload_lock = threading.Lock()
+_signature: Optional[Signature] = None
+_reloads = 0
+_reload_failures = 0
+
+# Optional statistical tier; see configure_classifier.
+_classifier = None
+_classifier_weight = 0.0
+
+# Session scoring: each repeat of an indicator in a later message adds this
+# share of its weight again, for at most this many repeats.
+_REPEAT_BONUS = 0.25
+_MAX_REPEATS = 2
+
+# Score events kept per session in SessionState.scoreTimeline.
+TIMELINE_LENGTH = 32
+
 _URL_PATTERN = re.compile(r"https?://\S+", re.IGNORECASE)
 _PHONE_PATTERN = re.compile(r"(?:\+?\d[\d\s\-]{7,}\d)")
+_DIGIT_PATTERN = re.compile(r"\d")
 
 
-def detect_scam_intent(text: str) -> DetectorResult:
-    normalized = (text or "").lower()
-    indicators: List[str] = []
-    score = 0.0
+def _evidence(normalized: str, matcher) -> Tuple[float, List[str], Dict[str, float]]:
+    score, indicators = matcher.score(normalized)
+    weights = {keyword: matcher.weights[keyword] for keyword in indicators}
 
-    for keyword, weight in _SCAM_KEYWORDS.items():
-        if keyword in normalized:
-            indicators.append(keyword)
-            score += weight
-
-    if _URL_PATTERN.search(normalized):
+    if "://" in normalized and _URL_PATTERN.search(normalized):
         indicators.append("url")
+        weights["url"] = 0.2
         score += 0.2
 
-    if _PHONE_PATTERN.search(normalized):
+    if _DIGIT_PATTERN.search(normalized) and _PHONE_PATTERN.search(normalized):
         indicators.append("phone")
+        weights["phone"] = 0.1
         score += 0.1
 
+    return score, indicators, weights
+
+
+def _add_classifier(
+    probability: float, threshold: float, weight: float, score: float, indicators: List[str], weights: Dict[str, float]
+) -> float:
+    if probability >= threshold:
+        indicators.append("classifier")
+        weights["classifier"] = weight * probability
+        score += weights["classifier"]
+    return score
+
+
+def detect_scam_intent(text: str) -> DetectorResult:
+    normalized = (text or "").lower()
+    score, indicators, weights = _evidence(normalized, _lexicon.matcher)
+
+    classifier = _classifier
+    if classifier is not None:
+        score = _add_classifier(
+            classifier.score(normalized), classifier.threshold, _classifier_weight, score, indicators, weights
+        )
+
     score = min(score, 1.0)
-    return DetectorResult(score=score, indicators=sorted(set(indicators)))
+    return DetectorResult(score=score, indicators=sorted(set(indicators)), weights=weights)
+
+
+def detect_many(texts: Sequence[str]) -> Tuple[List[float], List[List[str]]]:
+    """
+    Score a chunk of messages; returns (scores, indicators) columns.
+
+    Each text is lowercased once for both tiers, the active lexicon and
+    classifier are read once for the whole chunk, and the classifier scores
+    the chunk in one vectorised call. Values match ``detect_scam_intent``
+    (classifier probabilities up to float summation order).
+    """
+    normalized = [(text or "").lower() for text in texts]
+    matcher = _lexicon.matcher
+    classifier = _classifier
+    weight = _classifier_weight
+    probabilities = None
+    if classifier is not None and normalized:
+        probabilities = classifier.score_batch(normalized, lowered=True).tolist()
+
+    scores: List[float] = []
+    indicator_column: List[List[str]] = []
+    for index, text in enumerate(normalized):
+        score, indicators, weights = _evidence(text, matcher)
+        if probabilities is not None:
+            score = _add_classifier(probabilities[index], classifier.threshold, weight, score, indicators, weights)
+        scores.append(min(score, 1.0))
+        indicator_column.append(sorted(set(indicators)))
+    return scores, indicator_column
+
+
+def score_evidence(counts: Dict[str, int], weights: Dict[str, float]) -> float:
+    """
+    Session score for indicator message counts and their weights, as kept in
+    ``SessionState.indicatorCounts`` and ``indicatorWeights``.
+    """
+    evidence = 0.0
+    for indicator, count in counts.items():
+        repeats = min(count - 1, _MAX_REPEATS)
+        evidence += weights.get(indicator, 0.0) * (1.0 + _REPEAT_BONUS * repeats)
+    return min(evidence, 1.0)
+
+
+def update_session_score(state: SessionState, result: DetectorResult) -> float:
+    """
+    Fold one scammer message's detector result into the session's evidence
+    and return the cumulative session score.
+
+    ``state.indicatorCounts`` counts the messages each indicator appeared
+    in. The session score adds each distinct indicator's weight once, plus
+    ``_REPEAT_BONUS`` of it for each repeat, up to ``_MAX_REPEATS``. The sum
+    is capped at 1, like the per-message score. For a single message the
+    two scores are equal, so ``SCAM_THRESHOLD`` keeps its meaning, while
+    signals spread over several messages now add up. Each call costs time
+    in the message length and the session's distinct indicators, never in
+    the conversation history.
+    """
+    counts = state.indicatorCounts
+    session_weights = state.indicatorWeights
+    for indicator in result.indicators:
+        counts[indicator] = counts.get(indicator, 0) + 1
+        session_weights[indicator] = max(result.weights.get(indicator, 0.0), session_weights.get(indicator, 0.0))
+    session_score = score_evidence(counts, session_weights)
+    if result.indicators:
+        state.scoreTimeline.append(
+            ScoreEvent(
+                turn=state.totalMessagesExchanged,
+                score=result.score,
+                sessionScore=session_score,
+                indicators=list(result.indicators),
+            )
+        )
+        del state.scoreTimeline[:-TIMELINE_LENGTH]
+    return session_score
+
+
+def reload_lexicon(directory: str, force: bool = False) -> bool:
+    """
+    Load the packs in ``directory`` on top of the built-in table and install
+    them if anything changed since the last load.
+
+    Every pack is verified before the new lexicon is compiled, and the
+    compiled lexicon is swapped in with a single assignment. If any pack
+    fails to load, the current lexicon stays in place and the error is
+    raised.
+    """
+    global _lexicon, _signature, _reloads, _reload_failures
+    with _reload_lock:
+        try:
+            signature = directory_signature(directory)
+            if not force and signature == _signature:
+                return False
+            packs = [_BUILTIN_PACK] + [load_pack(path) for path in pack_paths(directory)]
+        except (OSError, ValueError):
+            _reload_failures += 1
+            raise
+        _lexicon = build_lexicon(packs)
+        _signature = signature
+        _reloads += 1
+    logger.info(
+        "Installed scam lexicon: %s keywords from %s",
+        len(_lexicon.matcher),
+        ", ".join(f"{pack.name}@{pack.version}" for pack in _lexicon.packs),
+    )
+    return True
+
+
+def configure_classifier(path: str, weight: float) -> None:
+    """
+    Load the NumPy classifier from ``path`` as an extra detector tier.
+
+    When its probability reaches the model's threshold, the message gains a
+    ``classifier`` indicator worth ``weight * probability``. An empty path
+    turns the tier off.
+    """
+    global _classifier, _classifier_weight
+    if not path:
+        _classifier = None
+        return
+    from .classifier import LinearClassifier
+
+    _classifier_weight = weight
+    _classifier = LinearClassifier.load(path)
+    logger.info("Loaded scam classifier %s (%s hash bits)", path, _classifier.hash_bits)
+
+
+def lexicon_stats() -> Dict[str, object]:
+    stats = _lexicon.stats()
+    stats["reloads"] = _reloads
+    stats["reloadFailures"] = _reload_failures
+    return stats
+
+
+def detector_state() -> Tuple[Any, ...]:
+    # Picklable copy of the active tiers, for batch worker processes.
+    return _lexicon, _classifier, _classifier_weight
+
+
+def install_detector_state(state: Tuple[Any, ...]) -> None:
+    global _lexicon, _classifier, _classifier_weight
+    _lexicon, _classifier, _classifier_weight = state
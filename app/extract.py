@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import re
-from typing import Set
+from typing import List, Sequence, Set, Tuple
 
 from .models import ExtractionResult
 
@@ -9,6 +9,7 @@ _BANK_PATTERN = re.compile(r"\b(?:\d[ -]?){9,18}\b")
 _UPI_PATTERN = re.compile(r"\b[a-z0-9.\-_]{2,}@[a-z]{2,}\b", re.IGNORECASE)
 _URL_PATTERN = re.compile(r"https?://[^\s]+", re.IGNORECASE)
 _PHONE_PATTERN = re.compile(r"(?:\+?\d[\d\s\-]{7,}\d)")
+_DIGIT_PATTERN = re.compile(r"\d")
 
 _SUSPICIOUS_KEYWORDS = {
     "urgent",
@@ -40,13 +41,20 @@ def _normalize_account(value: str) -> str:
     return re.sub(r"\D", "", value)
 
 
-def extract_intelligence(text: str) -> ExtractionResult:
+def _fields(text: str) -> Tuple[List[str], List[str], List[str], List[str], List[str]]:
     normalized = text or ""
 
-    bank_accounts: Set[str] = set(_normalize_account(m) for m in _BANK_PATTERN.findall(normalized))
-    upi_ids: Set[str] = set(m.lower() for m in _UPI_PATTERN.findall(normalized))
-    phishing_links: Set[str] = set(m.lower().rstrip(").,;!") for m in _URL_PATTERN.findall(normalized))
-    phone_numbers: Set[str] = set(_normalize_phone(m) for m in _PHONE_PATTERN.findall(normalized))
+    # Most chat messages carry no digits, "@" or "://"; skip the patterns
+    # that cannot match rather than scanning the text with each of them.
+    bank_accounts: Set[str] = set()
+    phone_numbers: Set[str] = set()
+    if _DIGIT_PATTERN.search(normalized):
+        bank_accounts = set(_normalize_account(m) for m in _BANK_PATTERN.findall(normalized))
+        phone_numbers = set(_normalize_phone(m) for m in _PHONE_PATTERN.findall(normalized))
+    upi_ids: Set[str] = set(m.lower() for m in _UPI_PATTERN.findall(normalized)) if "@" in normalized else set()
+    phishing_links: Set[str] = (
+        set(m.lower().rstrip(").,;!") for m in _URL_PATTERN.findall(normalized)) if "://" in normalized else set()
+    )
 
     # Avoid phone numbers being treated as bank accounts
     bank_accounts = {a for a in bank_accounts if a not in phone_numbers and len(a) != 10}
@@ -57,15 +65,35 @@ def extract_intelligence(text: str) -> ExtractionResult:
         if k in lowered:
             suspicious_keywords.add(k)
 
+    return (
+        sorted(bank_accounts),
+        sorted(upi_ids),
+        sorted(phishing_links),
+        sorted(phone_numbers),
+        sorted(suspicious_keywords),
+    )
+
+
+def extract_intelligence(text: str) -> ExtractionResult:
+    bank_accounts, upi_ids, phishing_links, phone_numbers, suspicious_keywords = _fields(text)
     return ExtractionResult(
-        bankAccounts=sorted(bank_accounts),
-        upiIds=sorted(upi_ids),
-        phishingLinks=sorted(phishing_links),
-        phoneNumbers=sorted(phone_numbers),
-        suspiciousKeywords=sorted(suspicious_keywords),
+        bankAccounts=bank_accounts,
+        upiIds=upi_ids,
+        phishingLinks=phishing_links,
+        phoneNumbers=phone_numbers,
+        suspiciousKeywords=suspicious_keywords,
     )
 
 
+def extract_many(texts: Sequence[str]) -> Tuple[List[List[str]], ...]:
+    # Columns in ExtractionResult field order, one row per text.
+    columns: Tuple[List[List[str]], ...] = ([], [], [], [], [])
+    for text in texts:
+        for column, values in zip(columns, _fields(text)):
+            column.append(values)
+    return columns
+
+
 def merge_extraction(existing: ExtractionResult, incoming: ExtractionResult) -> ExtractionResult:
     return ExtractionResult(
         bankAccounts=sorted(set(existing.bankAccounts).union(incoming.bankAccounts)),
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Mapping, Tuple
+
+from .matcher import KeywordMatcher
+
+# (file name, mtime in ns, size) for every pack in a directory.
+Signature = Tuple[Tuple[str, int, int], ...]
+
+
+def pack_checksum(keywords: Mapping[str, float]) -> str:
+    canonical = json.dumps(dict(keywords), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class LexiconPack:
+    name: str
+    version: str
+    sha256: str
+    keywords: Dict[str, float]
+
+
+@dataclass(frozen=True)
+class Lexicon:
+    packs: Tuple[LexiconPack, ...]
+    matcher: KeywordMatcher
+    loaded_at: str
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "keywords": len(self.matcher),
+            "loadedAt": self.loaded_at,
+            "packs": [
+                {"name": pack.name, "version": pack.version, "sha256": pack.sha256, "keywords": len(pack.keywords)}
+                for pack in self.packs
+            ],
+        }
+
+
+def make_pack(name: str, version: str, keywords: Mapping[str, float]) -> LexiconPack:
+    normalized = {phrase.strip().lower(): float(weight) for phrase, weight in keywords.items()}
+    return LexiconPack(name=name, version=version, sha256=pack_checksum(normalized), keywords=normalized)
+
+
+def load_pack(path: str) -> LexiconPack:
+    """
+    Read and verify one pack file.
+
+    A pack is a JSON object with ``name``, ``version``, ``sha256`` and
+    ``keywords`` (phrase -> weight in (0, 1]). ``sha256`` must match
+    ``pack_checksum`` of the keywords exactly as written, so a truncated or
+    hand-edited file is rejected. Phrases are lowercased because the
+    detector matches against lowercased text.
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: pack must be a JSON object")
+    name = str(data.get("name") or os.path.splitext(os.path.basename(path))[0])
+    version = str(data.get("version") or "")
+    keywords = data.get("keywords")
+    if not version:
+        raise ValueError(f"{path}: pack has no version")
+    if not isinstance(keywords, dict) or not keywords:
+        raise ValueError(f"{path}: pack has no keywords")
+    checksum = pack_checksum(keywords)
+    if data.get("sha256") != checksum:
+        raise ValueError(f"{path}: checksum mismatch (expected {checksum})")
+    normalized: Dict[str, float] = {}
+    for phrase, weight in keywords.items():
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not 0 < weight <= 1:
+            raise ValueError(f"{path}: weight for {phrase!r} must be in (0, 1]")
+        phrase = phrase.strip().lower()
+        if phrase:
+            normalized[phrase] = max(float(weight), normalized.get(phrase, 0.0))
+    return LexiconPack(name=name, version=version, sha256=checksum, keywords=normalized)
+
+
+def pack_paths(directory: str) -> List[str]:
+    return sorted(
+        os.path.join(directory, entry)
+        for entry in os.listdir(directory)
+        if entry.endswith(".json") and not entry.startswith(".")
+    )
+
+
+def directory_signature(directory: str) -> Signature:
+    signature = []
+    for path in pack_paths(directory):
+        info = os.stat(path)
+        signature.append((os.path.basename(path), info.st_mtime_ns, info.st_size))
+    return tuple(signature)
+
+
+def build_lexicon(packs: List[LexiconPack]) -> Lexicon:
+    # A phrase listed by several packs keeps its highest weight.
+    weights: Dict[str, float] = {}
+    for pack in packs:
+        for phrase, weight in pack.keywords.items():
+            if weight > weights.get(phrase, 0.0):
+                weights[phrase] = weight
+    return Lexicon(
+        packs=tuple(packs),
+        matcher=KeywordMatcher(weights),
+        loaded_at=datetime.now(timezone.utc).isoformat(),
+    )
+
+
+def _sign(path: str) -> None:
+    with open(path, "r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    data["sha256"] = pack_checksum(data.get("keywords") or {})
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, ensure_ascii=False, indent=2)
+        handle.write("\n")
+    os.replace(tmp_path, path)
+    print(f"{path}: {data['sha256']}")
+
+
+if __name__ == "__main__":
+    # python -m app.lexicon pack.json [...]  -- (re)write each pack's checksum
+    for pack_path in sys.argv[1:]:
+        _sign(pack_path)
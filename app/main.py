@@ -1,22 +1,35 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Callable, Optional
 
-from fastapi import Body, FastAPI, Header, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message as ASGIMessage, Receive, Scope, Send
 
-from .agent import build_agent_reply
-from .callback import send_final_callback
+from .agent import build_agent_reply_async, cache_stats, close_client, configure_cache, configure_client
+from .callback import build_final_payload
 from .config import Settings, load_settings
-from .config import detect_scam_intent
+from .detector import configure_classifier, detect_scam_intent, lexicon_stats, reload_lexicon, update_session_score
 from .extract import extract_intelligence, merge_extraction
-from .models import ErrorResponse, IncomingRequest, ReplyResponse
-from .store import SessionStore
+from .models import ErrorResponse, IncomingRequest, ReplyResponse, SessionState
+from .outbox import CallbackOutbox
+from .snapshot import dump_snapshot, load_snapshot
+from .store import SessionBackend, SessionStore, create_store
+
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -29,8 +42,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-store = SessionStore()
+store: SessionBackend = SessionStore()
 settings: Optional[Settings] = None
+agent_executor: Optional[ThreadPoolExecutor] = None
+outbox: Optional[CallbackOutbox] = None
+session_sweeper: Optional[asyncio.Task] = None
+lexicon_watcher: Optional[asyncio.Task] = None
+
+
+def _json_loads(body: bytes):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body.decode("utf-8"))
 
 
 def _safe_success(reply: str = "OK") -> JSONResponse:
@@ -70,11 +93,205 @@ async def message_head() -> JSONResponse:
 
 @app.on_event("startup")
 def _load_settings() -> None:
-    global settings
+    global settings, agent_executor, store
     settings = load_settings()
+    store = create_store(settings)
+    snapshot_path = settings.session_snapshot_path
+    if snapshot_path and os.path.exists(snapshot_path):
+        try:
+            load_snapshot(store, snapshot_path)
+        except (OSError, ValueError):
+            logger.exception("Failed to load session snapshot %s", snapshot_path)
+    if settings.lexicon_dir:
+        try:
+            reload_lexicon(settings.lexicon_dir)
+        except (OSError, ValueError):
+            logger.exception("Failed to load lexicon packs from %s; using built-in keywords", settings.lexicon_dir)
+    try:
+        configure_classifier(settings.classifier_path, settings.classifier_weight)
+    except (OSError, ValueError, RuntimeError):
+        logger.exception("Failed to load classifier %s; continuing without it", settings.classifier_path)
+    configure_client(settings)
+    configure_cache(settings)
+    agent_executor = ThreadPoolExecutor(
+        max_workers=settings.agent_max_workers,
+        thread_name_prefix="agent",
+    )
     logger.info("Service started successfully")
 
 
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    global agent_executor
+    if agent_executor is not None:
+        agent_executor.shutdown(wait=False, cancel_futures=True)
+        agent_executor = None
+    close_client()
+
+
+def _mark_callback_delivered(session_id: str) -> None:
+    # The outbox runs this hook in a worker thread.
+    store.mark_callback_delivered(session_id)
+
+
+async def _store_call(method: Callable[..., Any], *args: Any) -> Any:
+    # The SQLite backends block on disk I/O and file locks, so they run in a
+    # worker thread; the in-memory store is cheap enough to call inline.
+    if isinstance(store, SessionStore):
+        return method(*args)
+    return await asyncio.to_thread(method, *args)
+
+
+def _get_or_initialize(session_id: str) -> SessionState:
+    state = store.get(session_id)
+    if state is None:
+        state = store.initialize(session_id)
+    return state
+
+
+async def _sweep_sessions(interval: float) -> None:
+    # Writes already evict from their own shard; this catches idle shards.
+    while True:
+        await asyncio.sleep(interval)
+        await _store_call(store.sweep)
+
+
+@app.on_event("startup")
+async def _start_session_sweeper() -> None:
+    global session_sweeper
+    if settings.session_ttl_seconds > 0:
+        interval = min(60.0, settings.session_ttl_seconds)
+        session_sweeper = asyncio.create_task(_sweep_sessions(interval), name="session-sweeper")
+
+
+@app.on_event("shutdown")
+async def _stop_session_sweeper() -> None:
+    global session_sweeper
+    if session_sweeper is not None:
+        session_sweeper.cancel()
+        try:
+            await session_sweeper
+        except asyncio.CancelledError:
+            pass
+        session_sweeper = None
+
+
+async def _watch_lexicon(directory: str, interval: float) -> None:
+    # Packs are parsed and compiled off the event loop; requests keep using
+    # the current lexicon until the new one is swapped in.
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(None, reload_lexicon, directory)
+        except (OSError, ValueError) as exc:
+            logger.warning("Lexicon reload failed; keeping current packs: %s", exc)
+
+
+@app.on_event("startup")
+async def _start_lexicon_watcher() -> None:
+    global lexicon_watcher
+    if settings.lexicon_dir and settings.lexicon_reload_seconds > 0:
+        lexicon_watcher = asyncio.create_task(
+            _watch_lexicon(settings.lexicon_dir, settings.lexicon_reload_seconds),
+            name="lexicon-watcher",
+        )
+
+
+@app.on_event("shutdown")
+async def _stop_lexicon_watcher() -> None:
+    global lexicon_watcher
+    if lexicon_watcher is not None:
+        lexicon_watcher.cancel()
+        try:
+            await lexicon_watcher
+        except asyncio.CancelledError:
+            pass
+        lexicon_watcher = None
+
+
+@app.on_event("startup")
+async def _start_outbox() -> None:
+    global outbox
+    outbox = CallbackOutbox(settings, on_delivered=_mark_callback_delivered)
+    await outbox.start()
+
+
+@app.on_event("shutdown")
+async def _stop_outbox() -> None:
+    global outbox
+    if outbox is not None:
+        await outbox.stop()
+        outbox.close()
+        outbox = None
+
+
+@app.on_event("shutdown")
+def _close_store() -> None:
+    # Runs after the outbox stops, so delivery acks are persisted too.
+    if settings is not None and settings.session_snapshot_path:
+        try:
+            dump_snapshot(store, settings.session_snapshot_path)
+        except OSError:
+            logger.exception("Failed to write session snapshot %s", settings.session_snapshot_path)
+    store.close()
+
+
+def _require_admin(x_api_key: Optional[str]) -> None:
+    if settings is None:
+        raise HTTPException(status_code=500, detail="Server not initialized")
+    if not x_api_key or x_api_key != settings.api_key:
+        raise HTTPException(status_code=401, detail="Invalid API key or malformed request")
+
+
+@app.get("/admin/stats")
+async def admin_stats(x_api_key: Optional[str] = Header(default=None, alias="x-api-key")) -> JSONResponse:
+    _require_admin(x_api_key)
+    content = {
+        "status": "success",
+        "llmCache": cache_stats(),
+        "sessions": store.stats(),
+        "lexicon": lexicon_stats(),
+    }
+    if outbox is not None:
+        content["outbox"] = outbox.stats()
+    return JSONResponse(status_code=200, content=content)
+
+
+@app.post("/admin/outbox/replay")
+async def admin_outbox_replay(x_api_key: Optional[str] = Header(default=None, alias="x-api-key")) -> JSONResponse:
+    _require_admin(x_api_key)
+    if outbox is None:
+        raise HTTPException(status_code=500, detail="Server not initialized")
+    return JSONResponse(status_code=200, content={"status": "success", "replayed": await outbox.replay_dead_letters()})
+
+
+@app.post("/admin/sessions/snapshot")
+async def admin_sessions_snapshot(x_api_key: Optional[str] = Header(default=None, alias="x-api-key")) -> JSONResponse:
+    _require_admin(x_api_key)
+    if not settings.session_snapshot_path:
+        raise HTTPException(status_code=400, detail="SESSION_SNAPSHOT_PATH is not set")
+    loop = asyncio.get_running_loop()
+    try:
+        count = await loop.run_in_executor(None, dump_snapshot, store, settings.session_snapshot_path)
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=f"Snapshot failed: {exc}") from exc
+    return JSONResponse(status_code=200, content={"status": "success", "sessions": count})
+
+
+@app.post("/admin/lexicon/reload")
+async def admin_lexicon_reload(x_api_key: Optional[str] = Header(default=None, alias="x-api-key")) -> JSONResponse:
+    _require_admin(x_api_key)
+    if not settings.lexicon_dir:
+        raise HTTPException(status_code=400, detail="LEXICON_DIR is not set")
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, reload_lexicon, settings.lexicon_dir, True)
+    except (OSError, ValueError) as exc:
+        raise HTTPException(status_code=422, detail=f"Lexicon reload failed: {exc}") from exc
+    return JSONResponse(status_code=200, content={"status": "success", "lexicon": lexicon_stats()})
+
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
     # Ensure schema is always {status, message}
@@ -100,53 +317,97 @@ async def unhandled_exception_handler(request: Request, exc: Exception) -> JSONR
     )
 
 
-@app.middleware("http")
-async def tester_body_guard(request: Request, call_next):
+def _guard_response(headers: Headers, body: bytes, state: dict) -> Optional[JSONResponse]:
+    # settings should exist after startup, but be safe
+    if settings is None:
+        return JSONResponse(
+            status_code=500,
+            content=ErrorResponse(status="error", message="Server not initialized").model_dump(),
+        )
+
+    x_api_key = headers.get("x-api-key")
+    if not x_api_key or x_api_key != settings.api_key:
+        return JSONResponse(
+            status_code=401,
+            content=ErrorResponse(status="error", message="Invalid API key or malformed request").model_dump(),
+        )
+
+    if body is None or body.strip() == b"":
+        return _safe_success("OK")
+
+    try:
+        data = _json_loads(body)
+    except Exception:
+        return _safe_success("OK")
+
+    if not isinstance(data, dict):
+        return _safe_success("OK")
+
+    msg = data.get("message") if isinstance(data.get("message"), dict) else None
+    msg_text = msg.get("text") if msg else None
+    if not isinstance(msg_text, str) or not msg_text.strip():
+        return _safe_success("OK")
+
+    # Hand the parsed body to the handler so it is decoded only once.
+    state["payload"] = data
+    return None
+
+
+class TesterBodyGuard:
     """
     GUVI tester can send weird/missing body and expects your API to still respond.
     This guard ensures /message always returns a valid JSON response.
+
+    Plain ASGI middleware: everything except POST /message passes straight
+    through, without the task/stream wrapping of BaseHTTPMiddleware.
     """
-    if request.url.path == "/message" and request.method.upper() == "POST":
-        # settings should exist after startup, but be safe
-        if settings is None:
-            return JSONResponse(
-                status_code=500,
-                content=ErrorResponse(status="error", message="Server not initialized").model_dump(),
-            )
-
-        x_api_key = request.headers.get("x-api-key")
-        if not x_api_key or x_api_key != settings.api_key:
-            return JSONResponse(
-                status_code=401,
-                content=ErrorResponse(status="error", message="Invalid API key or malformed request").model_dump(),
-            )
-
-        body = await request.body()
-        if body is None or body.strip() == b"":
-            return _safe_success("OK")
 
-        try:
-            data = json.loads(body.decode("utf-8"))
-        except Exception:
-            return _safe_success("OK")
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] != "/message" or scope["method"].upper() != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        response = _guard_response(Headers(scope=scope), body, scope.setdefault("state", {}))
+        if response is not None:
+            await response(scope, receive, send)
+            return
+
+        replayed = False
 
-        if not isinstance(data, dict):
-            return _safe_success("OK")
+        async def replay_body() -> ASGIMessage:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
 
-        msg = data.get("message") if isinstance(data.get("message"), dict) else None
-        msg_text = msg.get("text") if msg else None
-        if not isinstance(msg_text, str) or not msg_text.strip():
-            return _safe_success("OK")
+        await self.app(scope, replay_body, send)
 
-    return await call_next(request)
+
+app.add_middleware(TesterBodyGuard)
 
 
 @app.post("/message")
 async def handle_message(
     request: Request,
-    payload: Optional[dict] = Body(default=None),
     x_api_key: Optional[str] = Header(default=None, alias="x-api-key"),
 ) -> JSONResponse:
+    started = time.monotonic()
+    payload = getattr(request.state, "payload", None)
+
     # auth
     if settings is None:
         raise HTTPException(status_code=500, detail="Server not initialized")
@@ -205,16 +466,14 @@ async def handle_message(
             session_id_raw = payload.get("sessionId")
             idx = 0
             if isinstance(session_id_raw, str) and session_id_raw.strip():
-                state = store.get(session_id_raw.strip())
-                if state is None:
-                    state = store.initialize(session_id_raw.strip())
+                state = await _store_call(_get_or_initialize, session_id_raw.strip())
                 state.totalMessagesExchanged += 1
                 idx = state.totalMessagesExchanged % len(fallback_options)
                 reply = fallback_options[idx]
                 if reply == state.lastReply:
                     reply = fallback_options[(idx + 1) % len(fallback_options)]
                 state.lastReply = reply
-                store.upsert(state)
+                await _store_call(store.upsert, state)
                 return _safe_success(reply)
 
             idx = abs(hash(message_text)) % len(fallback_options)
@@ -226,9 +485,7 @@ async def handle_message(
         # don’t hard fail GUVI; respond safely
         return _safe_success("OK")
 
-    state = store.get(session_id)
-    if state is None:
-        state = store.initialize(session_id)
+    state = await _store_call(_get_or_initialize, session_id)
     # ✅ IMPORTANT: DO NOT require conversationHistory. GUVI tester may omit it.
 
     incoming_text = incoming.message.text or ""
@@ -239,13 +496,15 @@ async def handle_message(
 
     if is_scammer:
         detector = detect_scam_intent(incoming_text)
+        session_score = update_session_score(state, detector)
         logger.info(
-            "scam_detector score=%s indicators=%s threshold=%s",
+            "scam_detector score=%s session_score=%s indicators=%s threshold=%s",
             detector.score,
+            session_score,
             detector.indicators,
             settings.scam_threshold,
         )
-        state.scamScore = max(state.scamScore, detector.score)
+        state.scamScore = max(state.scamScore, session_score)
 
         if state.scamScore >= settings.scam_threshold:
             state.scamConfirmed = True
@@ -279,12 +538,20 @@ async def handle_message(
 
     # build reply
     if state.agentActive:
-        agent_reply = build_agent_reply(
+        deadline: Optional[float] = None
+        if settings.request_budget_seconds > 0:
+            deadline = started + settings.request_budget_seconds
+        agent_reply = await build_agent_reply_async(
             state,
             incoming_text,
             (incoming.conversationHistory or []) + [incoming.message],
             settings.openai_api_key,
             settings.openai_model,
+            mode=settings.agent_mode,
+            candidates=settings.agent_candidates,
+            executor=agent_executor,
+            max_pending=settings.agent_max_pending,
+            deadline=deadline,
         )
         reply_text = agent_reply.reply
         state.agentNotes = agent_reply.agentNotes
@@ -315,12 +582,10 @@ async def handle_message(
         if scammer_turns >= settings.max_turns:
             state.terminated = True
 
-    # final callback
-    if state.terminated and state.scamConfirmed and not state.finalCallbackSent:
-        sent = send_final_callback(state, settings)
+    # final callback: persisted to the outbox, delivered (and retried) in the background
+    if state.terminated and state.scamConfirmed and not state.finalCallbackSent and outbox is not None:
+        await outbox.enqueue(build_final_payload(state))
         state.finalCallbackSent = True
-        if not sent:
-            logger.warning("Final callback failed for session %s", session_id)
 
-    store.upsert(state)
+    await _store_call(store.upsert, state)
     return _safe_success(reply_text)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Pattern, Set, Tuple
+
+
+# Below this many keywords, one substring test per keyword is faster than
+# the regex scan, whose fixed per-position cost dominates small tables.
+_REGEX_MIN_KEYWORDS = 128
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _node_pattern(trie)
+
+
+def _node_pattern(node: Dict[str, dict]) -> str:
+    # Children start with distinct characters, so at most one branch can
+    # match; a greedy optional group prefers the longer keyword.
+    branches = [re.escape(char) + _node_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    terminal = "" in node
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    group = "(?:" + "|".join(branches) + ")"
+    return group + "?" if terminal else group
+
+
+class KeywordMatcher:
+    """
+    Finds every keyword that occurs in a text, in one regex pass.
+
+    The keywords compile into a trie-shaped alternation wrapped in a
+    lookahead. The scan therefore tries every start position and reports the
+    longest keyword beginning there. Shorter keywords that begin at the same
+    position are prefixes of that match and come from a precomputed prefix
+    closure. Overlapping and nested keywords are all found, exactly as with
+    one substring test per keyword, at a cost that no longer grows with the
+    number of keywords. Tables smaller than ``_REGEX_MIN_KEYWORDS`` use the
+    substring tests instead, which are cheaper at that size.
+    """
+
+    def __init__(self, weights: Mapping[str, float]) -> None:
+        self.weights: Dict[str, float] = {keyword: weight for keyword, weight in weights.items() if keyword}
+        self._order = {keyword: index for index, keyword in enumerate(self.weights)}
+        self._closure: Dict[str, Tuple[str, ...]] = {}
+        self._pattern: Optional[Pattern[str]] = None
+        if len(self.weights) >= _REGEX_MIN_KEYWORDS:
+            keywords = set(self.weights)
+            self._closure = {
+                keyword: tuple(keyword[:end] for end in range(1, len(keyword) + 1) if keyword[:end] in keywords)
+                for keyword in keywords
+            }
+            self._pattern = re.compile("(?=(" + _trie_pattern(keywords) + "))")
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def find(self, normalized: str) -> Set[str]:
+        if self._pattern is None:
+            return {keyword for keyword in self.weights if keyword in normalized}
+        found: Set[str] = set()
+        closure = self._closure
+        for longest in set(self._pattern.findall(normalized)):
+            found.update(closure[longest])
+        return found
+
+    def score(self, normalized: str) -> Tuple[float, List[str]]:
+        # Sum in table order so both scans give exactly the same score.
+        if self._pattern is None:
+            found = [keyword for keyword in self.weights if keyword in normalized]
+        else:
+            found = sorted(self.find(normalized), key=self._order.__getitem__)
+        weights = self.weights
+        score = 0.0
+        for keyword in found:
+            score += weights[keyword]
+        return score, found
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from typing import List, Literal, Optional
-from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 
 Sender = Literal["scammer", "user"]
 
@@ -55,6 +55,13 @@ class FinalCallbackPayload(BaseModel):
     agentNotes: str
 
 
+class ScoreEvent(BaseModel):
+    turn: int
+    score: float
+    sessionScore: float
+    indicators: List[str]
+
+
 class SessionState(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
@@ -67,6 +74,7 @@ class SessionState(BaseModel):
     turnsSinceChange: int = 0
     terminated: bool = False
     finalCallbackSent: bool = False
+    finalCallbackDelivered: bool = False
     extractedIntelligence: Intelligence
     lastScammerMessage: Optional[str] = None
     agentNotes: str = ""
@@ -76,6 +84,19 @@ class SessionState(BaseModel):
     recentScammer: List[str] = []
     recentHoneypot: List[str] = []
 
+    # Session-level scam evidence: how many scammer messages each indicator
+    # appeared in, its weight, and the latest turns that produced indicators.
+    indicatorCounts: Dict[str, int] = {}
+    indicatorWeights: Dict[str, float] = {}
+    scoreTimeline: List[ScoreEvent] = []
+
+    # Row version the state was read at; used by the shared store's CAS.
+    _version: int = PrivateAttr(default=0)
+    # Counters as they were when the row was read, so a conflicting write
+    # can be merged as theirs + (ours - read).
+    _read_messages: int = PrivateAttr(default=0)
+    _read_counts: Dict[str, int] = PrivateAttr(default_factory=dict)
+
 
 class ExtractionResult(BaseModel):
     bankAccounts: List[str]
@@ -88,6 +109,7 @@ class ExtractionResult(BaseModel):
 class DetectorResult(BaseModel):
     score: float
     indicators: List[str]
+    weights: Dict[str, float] = {}
 
 
 class AgentReply(BaseModel):
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import sqlite3
+import time
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from .breaker import HALF_OPEN, CircuitBreaker
+from .callback import send_final_callback, send_final_callback_batch
+from .config import Settings
+from .models import FinalCallbackPayload
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt_at);
+CREATE TABLE IF NOT EXISTS dead_letter (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    failed_at REAL NOT NULL,
+    last_error TEXT
+);
+"""
+
+# Upper bound on how long the worker sleeps before re-checking for due rows.
+_POLL_SECONDS = 5.0
+
+
+class CallbackOutbox:
+    """
+    Durable queue of final callbacks backed by SQLite.
+
+    Each payload stays in the ``outbox`` table until the endpoint acknowledges
+    it. Failed attempts are retried with jittered exponential backoff. After
+    ``callback_max_attempts`` the payload moves to ``dead_letter``, where
+    ``replay_dead_letters`` can put it back in the queue. Rows are leased
+    while in flight, so a crashed process simply lets the lease expire.
+    Deliveries go through a circuit breaker and are capped at
+    ``callback_max_inflight`` concurrent requests. With
+    ``callback_batch_size`` > 1, payloads that come due within
+    ``callback_batch_window_ms`` of each other go out together, and each item
+    is acknowledged separately.
+
+    SQLite calls can wait up to ``busy_timeout`` on another process's write
+    lock, so the coroutines run them in a worker thread and the event loop
+    keeps serving requests meanwhile. The ``on_delivered`` hook runs in a
+    worker thread too, so it may block on the session store.
+    """
+
+    def __init__(self, settings: Settings, on_delivered: Optional[Callable[[str], None]] = None) -> None:
+        self._settings = settings
+        self._on_delivered = on_delivered
+        self._lock = Lock()
+        self._conn = sqlite3.connect(settings.outbox_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._claimed: Set[int] = set()
+        self._inflight: Set[asyncio.Task] = set()
+        self._breaker = CircuitBreaker(
+            settings.callback_breaker_threshold,
+            settings.callback_breaker_reset_seconds,
+        )
+        self.delivered = 0
+        self.failed_attempts = 0
+        self.dead_lettered = 0
+
+    async def start(self) -> None:
+        if self._worker is not None:
+            return
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self._settings.callback_max_inflight,
+                max_keepalive_connections=self._settings.callback_max_inflight,
+            ),
+            timeout=self._settings.http_timeout_seconds,
+        )
+        self._wakeup = asyncio.Event()
+        # One connection per slot, shared by every batch in flight.
+        self._slots = asyncio.Semaphore(self._settings.callback_max_inflight)
+        self._worker = asyncio.create_task(self._run(), name="callback-outbox")
+
+    def _insert(self, session_id: str, payload: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (session_id, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, payload, now, now),
+            )
+
+    async def enqueue(self, payload: FinalCallbackPayload) -> None:
+        await asyncio.to_thread(self._insert, payload.sessionId, payload.model_dump_json())
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _replay(self) -> int:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT INTO outbox (session_id, payload, next_attempt_at, created_at) "
+                    "SELECT session_id, payload, ?, created_at FROM dead_letter ORDER BY id",
+                    (now,),
+                )
+                replayed = cursor.rowcount
+                self._conn.execute("DELETE FROM dead_letter")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return replayed
+
+    async def replay_dead_letters(self) -> int:
+        replayed = await asyncio.to_thread(self._replay)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return replayed
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            pending = self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+            dead = self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+        return {
+            "pending": pending,
+            "deadLetter": dead,
+            "delivered": self.delivered,
+            "failedAttempts": self.failed_attempts,
+            "deadLettered": self.dead_lettered,
+            "inFlight": len(self._inflight),
+            "breaker": self._breaker.stats(),
+        }
+
+    def _lease_seconds(self) -> float:
+        # A lease must outlive the delivery. Pipelined batch items share
+        # callback_max_inflight connections with up to callback_max_inflight
+        # other batches, so an item can wait callback_batch_size rounds of
+        # requests for a connection.
+        rounds = 1
+        if self._settings.callback_batch_size > 1 and not self._settings.callback_batch_url:
+            rounds = self._settings.callback_batch_size
+        window = self._settings.callback_batch_window_ms / 1000
+        return self._settings.http_timeout_seconds * 2 * rounds + window + 5
+
+    def _claim_rows(self, limit: int, exclude: Set[int]) -> List[Tuple[int, str, str, int]]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, session_id, payload, attempts FROM outbox "
+                    "WHERE next_attempt_at <= ? AND lease_until <= ? ORDER BY id LIMIT ?",
+                    (now, now, limit + len(exclude)),
+                ).fetchall()
+                # Rows still being delivered here are never claimed twice,
+                # even if their lease has run out.
+                rows = [row for row in rows if row[0] not in exclude][:limit]
+                self._conn.executemany(
+                    "UPDATE outbox SET lease_until = ? WHERE id = ?",
+                    [(now + self._lease_seconds(), row[0]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    async def _claim_due(self, limit: int) -> List[Tuple[int, str, str, int]]:
+        rows = await asyncio.to_thread(self._claim_rows, limit, set(self._claimed))
+        self._claimed.update(row[0] for row in rows)
+        return rows
+
+    def _next_due(self) -> Optional[float]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MIN(MAX(next_attempt_at, lease_until)) FROM outbox",
+            ).fetchone()[0]
+
+    async def _seconds_until_due(self) -> float:
+        due = await asyncio.to_thread(self._next_due)
+        if due is None:
+            return _POLL_SECONDS
+        return min(_POLL_SECONDS, max(0.0, due - time.time()))
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(
+            self._settings.callback_backoff_max_seconds,
+            self._settings.callback_backoff_base_seconds * (2 ** (attempts - 1)),
+        )
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _delete(self, row_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+
+    async def _ack(self, row_id: int, session_id: str) -> None:
+        await asyncio.to_thread(self._delete, row_id)
+        self._claimed.discard(row_id)
+        self.delivered += 1
+        if self._on_delivered is not None:
+            try:
+                await asyncio.to_thread(self._on_delivered, session_id)
+            except Exception:
+                logger.exception("on_delivered hook failed for session %s", session_id)
+
+    def _fail(self, row_id: int, attempts: int, error: str) -> bool:
+        # Returns True when the row moved to the dead letter table.
+        now = time.time()
+        with self._lock:
+            if attempts >= self._settings.callback_max_attempts:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute(
+                        "INSERT INTO dead_letter (session_id, payload, attempts, created_at, failed_at, last_error) "
+                        "SELECT session_id, payload, ?, created_at, ?, ? FROM outbox WHERE id = ?",
+                        (attempts, now, error, row_id),
+                    )
+                    self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                return True
+            self._conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, lease_until = 0, last_error = ? WHERE id = ?",
+                (attempts, now + self._backoff(attempts), error, row_id),
+            )
+            return False
+
+    async def _nack(self, row_id: int, session_id: str, attempts: int, error: str) -> None:
+        self.failed_attempts += 1
+        if await asyncio.to_thread(self._fail, row_id, attempts, error):
+            self.dead_lettered += 1
+            logger.error("Final callback for session %s dead-lettered after %s attempts", session_id, attempts)
+        self._claimed.discard(row_id)
+
+    def _postpone(self, row_ids: List[int], delay: float) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET next_attempt_at = ?, lease_until = 0 WHERE id = ?",
+                [(time.time() + delay, row_id) for row_id in row_ids],
+            )
+
+    async def _defer(self, row_ids: List[int], delay: float) -> None:
+        # Not attempted (circuit open), so the attempt counter is left alone.
+        await asyncio.to_thread(self._postpone, row_ids, delay)
+        self._claimed.difference_update(row_ids)
+
+    async def _deliver(self, rows: List[Tuple[int, str, str, int]]) -> None:
+        if not self._breaker.allow():
+            delay = max(self._breaker.retry_after(), self._settings.callback_backoff_base_seconds)
+            await self._defer([row[0] for row in rows], delay)
+            return
+
+        batch: List[Tuple[Tuple[int, str, str, int], FinalCallbackPayload]] = []
+        for row in rows:
+            try:
+                batch.append((row, FinalCallbackPayload.model_validate_json(row[2])))
+            except Exception as exc:
+                await self._nack(row[0], row[1], self._settings.callback_max_attempts, repr(exc))
+
+        try:
+            payloads = [payload for _, payload in batch]
+            if self._settings.callback_batch_size > 1:
+                results = await send_final_callback_batch(payloads, self._settings, self._client, self._slots)
+            else:
+                results = [await send_final_callback(payload, self._settings, self._client) for payload in payloads]
+            error = "endpoint rejected or unreachable"
+        except Exception as exc:
+            logger.exception("Final callback delivery crashed for %s sessions", len(batch))
+            results, error = [False] * len(batch), repr(exc)
+
+        if any(results):
+            self._breaker.record_success()
+        elif batch:
+            self._breaker.record_failure()
+
+        for ((row_id, session_id, _, attempts), _), sent in zip(batch, results):
+            if sent:
+                await self._ack(row_id, session_id)
+            else:
+                logger.warning("Final callback attempt %s failed for session %s", attempts + 1, session_id)
+                await self._nack(row_id, session_id, attempts + 1, error)
+
+    async def _claim_batch(self) -> List[Tuple[int, str, str, int]]:
+        size = self._settings.callback_batch_size
+        rows = await self._claim_due(size)
+        window = self._settings.callback_batch_window_ms / 1000
+        if rows and len(rows) < size and window > 0:
+            # Let sessions terminating in the same burst join this batch.
+            await asyncio.sleep(window)
+            rows += await self._claim_due(size - len(rows))
+        return rows
+
+    def _delivery_done(self, task: asyncio.Task) -> None:
+        self._inflight.discard(task)
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        # Dispatcher: keeps at most callback_max_inflight deliveries running
+        # and stops claiming work while the circuit is open or its probes
+        # are still out.
+        while True:
+            self._wakeup.clear()
+            try:
+                free = self._settings.callback_max_inflight - len(self._inflight)
+                retry_after = self._breaker.retry_after()
+                if self._breaker.state == HALF_OPEN:
+                    # Claim only what the probes can carry; rejected rows
+                    # would just be pushed back.
+                    free = min(free, self._breaker.half_open_max_calls)
+                if free <= 0 or retry_after > 0:
+                    batches = []
+                elif self._settings.callback_batch_size > 1:
+                    rows = await self._claim_batch()
+                    batches = [rows] if rows else []
+                else:
+                    batches = [[row] for row in await self._claim_due(free)]
+                for batch in batches:
+                    task = asyncio.create_task(self._deliver(batch))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._delivery_done)
+                if batches:
+                    continue
+                if retry_after > 0:
+                    timeout = retry_after
+                elif free > 0:
+                    timeout = await self._seconds_until_due()
+                else:
+                    timeout = _POLL_SECONDS
+            except Exception:
+                logger.exception("Callback outbox iteration failed")
+                timeout = _POLL_SECONDS
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for task in list(self._inflight):
+            task.cancel()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        # Anything still in flight is retried on the next start.
+        await asyncio.to_thread(self._release, list(self._claimed))
+        self._claimed.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _release(self, row_ids: List[int]) -> None:
+        with self._lock:
+            self._conn.executemany("UPDATE outbox SET lease_until = 0 WHERE id = ?", [(row_id,) for row_id in row_ids])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
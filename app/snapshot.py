@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import IO
+
+from pydantic import ValidationError
+
+from .models import SessionState
+from .store import SessionBackend
+
+logger = logging.getLogger(__name__)
+
+_FORMAT = "honeypot-sessions"
+_VERSION = 1
+
+
+def _open(path: str, mode: str, compressed: bool) -> IO[str]:
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def dump_snapshot(store: SessionBackend, path: str) -> int:
+    """
+    Stream every live session to ``path`` as JSON lines.
+
+    The first line is a format header and each following line is one
+    ``SessionState``. A ``.gz`` suffix compresses the file. The store is read
+    incrementally through ``iter_sessions``, so no lock is held for the whole
+    dump. The file is written under a temporary name and renamed into place,
+    so readers never see a partial snapshot.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    count = 0
+    try:
+        with _open(tmp_path, "w", path.endswith(".gz")) as handle:
+            header = {
+                "format": _FORMAT,
+                "version": _VERSION,
+                "createdAt": datetime.now(timezone.utc).isoformat(),
+            }
+            handle.write(json.dumps(header) + "\n")
+            for state in store.iter_sessions():
+                handle.write(state.model_dump_json())
+                handle.write("\n")
+                count += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logger.info("Wrote %s sessions to %s", count, path)
+    return count
+
+
+def load_snapshot(store: SessionBackend, path: str) -> int:
+    """
+    Restore sessions from a snapshot written by ``dump_snapshot``.
+
+    Sessions the store already holds are left alone, since a durable
+    backend's rows may be newer than the snapshot. Returns how many
+    sessions were restored.
+    """
+    count = 0
+    skipped = 0
+    present = 0
+    with _open(path, "r", path.endswith(".gz")) as handle:
+        try:
+            header = json.loads(handle.readline() or "{}")
+        except json.JSONDecodeError:
+            header = {}
+        if header.get("format") != _FORMAT or header.get("version") != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} session snapshot")
+        for line in handle:
+            if not line.strip():
+                continue
+            try:
+                state = SessionState.model_validate_json(line)
+            except ValidationError:
+                skipped += 1
+                continue
+            if store.get(state.sessionId) is not None:
+                present += 1
+                continue
+            store.upsert(state)
+            count += 1
+    if skipped:
+        logger.warning("Skipped %s unreadable sessions in %s", skipped, path)
+    logger.info("Loaded %s sessions from %s (%s already present)", count, path, present)
+    return count
@@ -1,41 +1,285 @@
 from __future__ import annotations
 
+import copy
+import dataclasses
+import time
+import zlib
+from collections import OrderedDict
 from threading import Lock
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Protocol, Tuple, Union, get_args, get_origin
 
+from pydantic import BaseModel
+
+from .compact import CompactSession, Flag, from_compact, to_compact
+from .config import Settings
 from .models import Intelligence, SessionState
 
 
-class SessionStore:
+_IMMUTABLE = (str, int, float, bool, type(None))
+_COPY_PLANS: Dict[type, Tuple[Tuple[str, Callable[[Any], Any]], ...]] = {}
+
+
+def _is_immutable(annotation: Any) -> bool:
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return True
+    if origin is Union:
+        return all(_is_immutable(arg) for arg in get_args(annotation))
+    return annotation in _IMMUTABLE
+
+
+def _copier(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    if _is_immutable(annotation):
+        return None
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _clone
+    if origin is list and args and _is_immutable(args[0]):
+        return list
+    if origin is list and args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+        return _clone_list
+    if origin is dict and len(args) == 2 and _is_immutable(args[1]):
+        return dict
+    return copy.deepcopy
+
+
+def _copy_plan(cls: type) -> Tuple[Tuple[str, Callable[[Any], Any]], ...]:
+    plan = _COPY_PLANS.get(cls)
+    if plan is None:
+        plan = tuple(
+            (name, copier)
+            for name, field in cls.model_fields.items()
+            if (copier := _copier(field.annotation)) is not None
+        )
+        _COPY_PLANS[cls] = plan
+    return plan
+
+
+def _clone_list(models: List[BaseModel]) -> List[BaseModel]:
+    return [_clone(model) for model in models]
+
+
+def _clone(model: BaseModel) -> BaseModel:
+    # Copy only the mutable containers and nested models, share the immutable
+    # leaves. Callers get the same isolation as model_copy(deep=True) without
+    # deepcopy walking every string in every list.
+    copied = model.model_copy()
+    values = copied.__dict__
+    for name, copier in _copy_plan(type(model)):
+        value = values[name]
+        if value is not None:
+            values[name] = copier(value)
+    return copied
+
+
+def new_session(session_id: str) -> SessionState:
+    return SessionState(
+        sessionId=session_id,
+        extractedIntelligence=Intelligence(
+            bankAccounts=[],
+            upiIds=[],
+            phishingLinks=[],
+            phoneNumbers=[],
+            suspiciousKeywords=[],
+        ),
+        missingSlots=["upi", "phone", "phishing", "bank", "suspicious"],
+        recentScammer=[],
+        recentHoneypot=[],
+    )
+
+
+class _Shard:
+    __slots__ = ("lock", "sessions", "finished", "expired", "evicted_finished", "evicted_lru")
+
     def __init__(self) -> None:
-        self._lock = Lock()
-        self._sessions: Dict[str, SessionState] = {}
+        self.lock = Lock()
+        # Least recently used first; values are (last access, state).
+        self.sessions: "OrderedDict[str, Tuple[float, CompactSession]]" = OrderedDict()
+        # Terminated sessions whose final callback was delivered, oldest first.
+        self.finished: "OrderedDict[str, None]" = OrderedDict()
+        self.expired = 0
+        self.evicted_finished = 0
+        self.evicted_lru = 0
+
+
+class SessionStore:
+    """
+    In-memory session store with idle expiry and a size cap.
+
+    Sessions are held as immutable ``CompactSession`` records and are only
+    expanded into ``SessionState`` models by ``get``.
+
+    Sessions are spread over independently locked shards by sessionId, so
+    concurrent requests for different sessions rarely contend on a lock.
+    Sessions idle for ``ttl_seconds`` expire. Once a shard holds more than its
+    share of ``max_sessions``, finished sessions (terminated, final callback
+    delivered) are evicted first, then the least recently used. Zero disables
+    either limit.
+    """
+
+    def __init__(self, shards: int = 16, ttl_seconds: float = 0.0, max_sessions: int = 0) -> None:
+        self._shards: List[_Shard] = [_Shard() for _ in range(max(1, shards))]
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._shard_cap = -(-max_sessions // len(self._shards)) if max_sessions > 0 else 0
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[zlib.crc32(session_id.encode("utf-8")) % len(self._shards)]
+
+    def _drop(self, shard: _Shard, session_id: str) -> None:
+        del shard.sessions[session_id]
+        shard.finished.pop(session_id, None)
+
+    def _evict(self, shard: _Shard, now: float) -> None:
+        # Called with the shard lock held.
+        if self.ttl_seconds > 0:
+            cutoff = now - self.ttl_seconds
+            while shard.sessions:
+                session_id, (touched, _) = next(iter(shard.sessions.items()))
+                if touched > cutoff:
+                    break
+                self._drop(shard, session_id)
+                shard.expired += 1
+        if self._shard_cap <= 0:
+            return
+        while len(shard.sessions) > self._shard_cap and shard.finished:
+            session_id, _ = shard.finished.popitem(last=False)
+            del shard.sessions[session_id]
+            shard.evicted_finished += 1
+        while len(shard.sessions) > self._shard_cap:
+            session_id, _ = shard.sessions.popitem(last=False)
+            shard.finished.pop(session_id, None)
+            shard.evicted_lru += 1
+
+    def _put(self, shard: _Shard, compact: CompactSession) -> None:
+        now = time.monotonic()
+        session_id = compact.session_id
+        shard.sessions[session_id] = (now, compact)
+        shard.sessions.move_to_end(session_id)
+        if compact.has(Flag.TERMINATED) and compact.has(Flag.CALLBACK_DELIVERED):
+            shard.finished[session_id] = None
+        else:
+            shard.finished.pop(session_id, None)
+        self._evict(shard, now)
 
     def get(self, session_id: str) -> Optional[SessionState]:
-        with self._lock:
-            state = self._sessions.get(session_id)
-            if state is None:
+        shard = self._shard(session_id)
+        now = time.monotonic()
+        with shard.lock:
+            entry = shard.sessions.get(session_id)
+            if entry is None:
                 return None
-            return state.model_copy(deep=True)
+            touched, compact = entry
+            if self.ttl_seconds > 0 and touched <= now - self.ttl_seconds:
+                self._drop(shard, session_id)
+                shard.expired += 1
+                return None
+            shard.sessions[session_id] = (now, compact)
+            shard.sessions.move_to_end(session_id)
+        # Compact sessions are immutable, so the model can be built outside
+        # the lock, and every caller gets its own lists.
+        return from_compact(compact)
 
     def upsert(self, state: SessionState) -> None:
-        with self._lock:
-            self._sessions[state.sessionId] = state
+        compact = to_compact(state)
+        shard = self._shard(state.sessionId)
+        with shard.lock:
+            # The delivered flag is set out of band by the outbox; a turn that
+            # read the session before delivery must not clear it.
+            entry = shard.sessions.get(state.sessionId)
+            if entry is not None and entry[1].has(Flag.CALLBACK_DELIVERED) and not compact.has(Flag.CALLBACK_DELIVERED):
+                compact = dataclasses.replace(compact, flags=int(compact.flags | Flag.CALLBACK_DELIVERED))
+            self._put(shard, compact)
+
+    def mark_callback_delivered(self, session_id: str) -> bool:
+        shard = self._shard(session_id)
+        with shard.lock:
+            entry = shard.sessions.get(session_id)
+            if entry is None:
+                return False
+            compact = entry[1]
+            self._put(shard, dataclasses.replace(compact, flags=int(compact.flags | Flag.CALLBACK_DELIVERED)))
+        return True
 
     def initialize(self, session_id: str) -> SessionState:
-        with self._lock:
-            state = SessionState(
-                sessionId=session_id,
-                extractedIntelligence=Intelligence(
-                    bankAccounts=[],
-                    upiIds=[],
-                    phishingLinks=[],
-                    phoneNumbers=[],
-                    suspiciousKeywords=[],
-                ),
-                missingSlots=["upi", "phone", "phishing", "bank", "suspicious"],
-                recentScammer=[],
-                recentHoneypot=[],
-            )
-            self._sessions[session_id] = state
-            return state.model_copy(deep=True)
+        state = new_session(session_id)
+        compact = to_compact(state)
+        shard = self._shard(session_id)
+        with shard.lock:
+            self._put(shard, compact)
+        return state
+
+    def iter_sessions(self) -> Iterator[SessionState]:
+        # One shard is locked at a time, and only while its references are
+        # copied. Records are immutable, so they expand after the release.
+        for shard in self._shards:
+            cutoff = time.monotonic() - self.ttl_seconds if self.ttl_seconds > 0 else float("-inf")
+            with shard.lock:
+                records = [compact for touched, compact in shard.sessions.values() if touched > cutoff]
+            for compact in records:
+                yield from_compact(compact)
+
+    def sweep(self) -> None:
+        now = time.monotonic()
+        for shard in self._shards:
+            with shard.lock:
+                self._evict(shard, now)
+
+    def stats(self) -> Dict[str, int]:
+        totals = {"size": 0, "finished": 0, "expired": 0, "evictedFinished": 0, "evictedLru": 0}
+        for shard in self._shards:
+            with shard.lock:
+                totals["size"] += len(shard.sessions)
+                totals["finished"] += len(shard.finished)
+                totals["expired"] += shard.expired
+                totals["evictedFinished"] += shard.evicted_finished
+                totals["evictedLru"] += shard.evicted_lru
+        return totals
+
+    def close(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return sum(len(shard.sessions) for shard in self._shards)
+
+
+class SessionBackend(Protocol):
+    def get(self, session_id: str) -> Optional[SessionState]: ...
+
+    def upsert(self, state: SessionState) -> None: ...
+
+    def mark_callback_delivered(self, session_id: str) -> bool: ...
+
+    def initialize(self, session_id: str) -> SessionState: ...
+
+    def iter_sessions(self) -> Iterator[SessionState]: ...
+
+    def sweep(self) -> None: ...
+
+    def stats(self) -> Dict[str, int]: ...
+
+    def close(self) -> None: ...
+
+
+def create_store(settings: Settings) -> SessionBackend:
+    if settings.session_backend == "shared":
+        from .store_sqlite import SharedSessionStore
+
+        return SharedSessionStore(settings.session_db_path, ttl_seconds=settings.session_ttl_seconds)
+    if settings.session_backend == "sqlite":
+        from .store_sqlite import SQLiteSessionStore
+
+        return SQLiteSessionStore(
+            settings.session_db_path,
+            shards=settings.session_store_shards,
+            ttl_seconds=settings.session_ttl_seconds,
+            max_sessions=settings.session_max_count,
+            flush_interval=settings.session_flush_interval_ms / 1000.0,
+            flush_batch_size=settings.session_flush_batch_size,
+        )
+    return SessionStore(
+        shards=settings.session_store_shards,
+        ttl_seconds=settings.session_ttl_seconds,
+        max_sessions=settings.session_max_count,
+    )
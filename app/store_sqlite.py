@@ -0,0 +1,448 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from .detector import TIMELINE_LENGTH, score_evidence
+from .models import Intelligence, SessionState
+from .store import SessionStore, _clone, new_session
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+"""
+
+# Statements are module constants so sqlite3's per-connection statement cache
+# compiles each one once and reuses it.
+_SELECT = "SELECT state, version FROM sessions WHERE session_id = ? AND updated_at > ?"
+# finalCallbackDelivered is sticky: a stale state written after the outbox
+# marked the row keeps the flag.
+_UPSERT = (
+    "INSERT INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?) "
+    "ON CONFLICT(session_id) DO UPDATE SET state = CASE "
+    "WHEN json_extract(sessions.state, '$.finalCallbackDelivered') "
+    "THEN json_set(excluded.state, '$.finalCallbackDelivered', json('true')) ELSE excluded.state END, "
+    "updated_at = excluded.updated_at, version = sessions.version + 1"
+)
+_INSERT = "INSERT INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?) ON CONFLICT(session_id) DO NOTHING"
+_COMPARE_AND_SWAP = (
+    "UPDATE sessions SET state = ?, updated_at = ?, version = version + 1 "
+    "WHERE session_id = ? AND version = ?"
+)
+_MARK_DELIVERED = (
+    "UPDATE sessions SET state = json_set(state, '$.finalCallbackDelivered', json('true')), "
+    "version = version + 1 WHERE session_id = ?"
+)
+_EXPIRE = "DELETE FROM sessions WHERE updated_at <= ?"
+_PAGE = (
+    "SELECT state, version, session_id FROM sessions WHERE session_id > ? AND updated_at > ? "
+    "ORDER BY session_id LIMIT ?"
+)
+_PAGE_SIZE = 500
+
+# Conflicting writers are merged and retried this many times before the
+# merged state is written unconditionally.
+_CAS_ATTEMPTS = 5
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=64)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript(_SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+    if "version" not in columns:
+        conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+
+def _parse(row) -> SessionState:
+    state = SessionState.model_validate_json(row[0])
+    state._version = row[1]
+    state._read_messages = state.totalMessagesExchanged
+    state._read_counts = dict(state.indicatorCounts)
+    return state
+
+
+def _iter_rows(conn: sqlite3.Connection, lock: threading.Lock, cutoff: float) -> Iterator[SessionState]:
+    # Keyset pagination: the lock is held for one page at a time.
+    last = ""
+    while True:
+        with lock:
+            rows = conn.execute(_PAGE, (last, cutoff, _PAGE_SIZE)).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield _parse(row)
+        last = rows[-1][2]
+
+
+def _union(first: List[str], second: List[str]) -> List[str]:
+    seen = set(first)
+    return first + [item for item in second if item not in seen]
+
+
+def merge_states(ours: SessionState, theirs: SessionState) -> SessionState:
+    """
+    Combine a state with one another worker committed from the same base.
+
+    Message and indicator counters add our increments since the read to
+    theirs, so two concurrent turns both count. Our new timeline events are
+    renumbered onto their turn count, and the score is recomputed from the
+    merged counts. Flags only move one way during a conversation, so the
+    merge keeps any flag either side set.
+    Intelligence is unioned, missing slots keep only what both still miss,
+    and free-text fields come from ``ours`` because it is the latest write.
+    The result is based on ``theirs``, so it can be merged again if the
+    retried write conflicts too.
+    """
+    intel = ours.extractedIntelligence
+    other = theirs.extractedIntelligence
+    window = max(len(ours.recentScammer), len(theirs.recentScammer))
+    reply_window = max(len(ours.recentHoneypot), len(theirs.recentHoneypot))
+    read_messages = ours._read_messages
+    merged = _clone(ours)
+    merged.totalMessagesExchanged = theirs.totalMessagesExchanged + (ours.totalMessagesExchanged - read_messages)
+    merged.scamConfirmed = ours.scamConfirmed or theirs.scamConfirmed
+    merged.agentActive = ours.agentActive or theirs.agentActive
+    merged.terminated = ours.terminated or theirs.terminated
+    merged.finalCallbackSent = ours.finalCallbackSent or theirs.finalCallbackSent
+    merged.finalCallbackDelivered = ours.finalCallbackDelivered or theirs.finalCallbackDelivered
+    merged.extractedIntelligence = Intelligence(
+        bankAccounts=_union(other.bankAccounts, intel.bankAccounts),
+        upiIds=_union(other.upiIds, intel.upiIds),
+        phishingLinks=_union(other.phishingLinks, intel.phishingLinks),
+        phoneNumbers=_union(other.phoneNumbers, intel.phoneNumbers),
+        suspiciousKeywords=_union(other.suspiciousKeywords, intel.suspiciousKeywords),
+    )
+    merged.missingSlots = [slot for slot in ours.missingSlots if slot in theirs.missingSlots]
+    merged.recentScammer = _union(theirs.recentScammer, ours.recentScammer)[-window:] if window else []
+    merged.recentHoneypot = _union(theirs.recentHoneypot, ours.recentHoneypot)[-reply_window:] if reply_window else []
+    read_counts = ours._read_counts
+    merged.indicatorCounts = dict(theirs.indicatorCounts)
+    for indicator, count in ours.indicatorCounts.items():
+        added = count - read_counts.get(indicator, 0)
+        if added:
+            merged.indicatorCounts[indicator] = merged.indicatorCounts.get(indicator, 0) + added
+    for indicator, weight in theirs.indicatorWeights.items():
+        merged.indicatorWeights[indicator] = max(weight, merged.indicatorWeights.get(indicator, 0.0))
+    # Rescored from the merged evidence, so each turn's indicators count; the
+    # committed score is a floor for rows written before counts were kept.
+    merged.scamScore = max(theirs.scamScore, score_evidence(merged.indicatorCounts, merged.indicatorWeights))
+    shift = theirs.totalMessagesExchanged - read_messages
+    ours_new = [
+        event.model_copy(update={"turn": event.turn + shift})
+        for event in ours.scoreTimeline
+        if event.turn > read_messages
+    ]
+    timeline = sorted(theirs.scoreTimeline + ours_new, key=lambda event: event.turn)
+    merged.scoreTimeline = timeline[-TIMELINE_LENGTH:]
+    merged._version = theirs._version
+    merged._read_messages = theirs.totalMessagesExchanged
+    merged._read_counts = dict(theirs.indicatorCounts)
+    return merged
+
+
+class SQLiteSessionStore:
+    """
+    Session store persisted to SQLite, so conversations survive restarts.
+
+    Reads go through an in-memory ``SessionStore`` that serves as a cache. It
+    uses the same TTL and size limits, and a miss falls back to the database.
+    Writes update the cache immediately and are flushed by a background
+    thread in one transaction per batch. A batch goes out once
+    ``flush_batch_size`` sessions are dirty or ``flush_interval`` seconds have
+    passed, so a crash loses at most that window. Rows idle longer than
+    ``ttl_seconds`` are deleted by ``sweep``, which hands the delete to the
+    same thread so it never waits on the write lock itself.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        shards: int = 16,
+        ttl_seconds: float = 0.0,
+        max_sessions: int = 0,
+        flush_interval: float = 0.05,
+        flush_batch_size: int = 256,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._flush_interval = flush_interval
+        self._flush_batch_size = max(1, flush_batch_size)
+        self._cache = SessionStore(shards=shards, ttl_seconds=ttl_seconds, max_sessions=max_sessions)
+        self._read_lock = threading.Lock()
+        self._reader = _connect(path)
+        _ensure_schema(self._reader)
+        self._writer = _connect(path)
+        self._cond = threading.Condition()
+        # Dirty sessions not yet handed to the writer, and the batch being
+        # written. Both are consulted on a cache miss so reads never see an
+        # older row than the last upsert.
+        self._pending: Dict[str, SessionState] = {}
+        self._writing: Dict[str, SessionState] = {}
+        self._sweep_due = False
+        self._closing = False
+        self.reads = 0
+        self.flushes = 0
+        self.written = 0
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+    def _load(self, session_id: str) -> Optional[SessionState]:
+        with self._cond:
+            state = self._pending.get(session_id) or self._writing.get(session_id)
+        if state is not None:
+            return state
+        with self._read_lock:
+            row = self._reader.execute(_SELECT, (session_id, self._cutoff())).fetchone()
+            self.reads += 1
+        if row is None:
+            return None
+        return _parse(row)
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        state = self._cache.get(session_id)
+        if state is not None:
+            return state
+        state = self._load(session_id)
+        if state is None:
+            return None
+        self._cache.upsert(state)
+        return _clone(state)
+
+    def upsert(self, state: SessionState) -> None:
+        self._cache.upsert(state)
+        with self._cond:
+            if not state.finalCallbackDelivered:
+                queued = self._pending.get(state.sessionId) or self._writing.get(state.sessionId)
+                if queued is not None and queued.finalCallbackDelivered:
+                    state = _clone(state)
+                    state.finalCallbackDelivered = True
+            self._pending[state.sessionId] = state
+            self._cond.notify()
+
+    def mark_callback_delivered(self, session_id: str) -> bool:
+        # Under the condition, so a concurrent upsert queues after this one
+        # and carries the flag forward instead of being overwritten by it.
+        with self._cond:
+            self._cache.mark_callback_delivered(session_id)
+            state = self._cache.get(session_id) or self._load(session_id)
+            if state is None:
+                return False
+            if not state.finalCallbackDelivered:
+                state = _clone(state)
+                state.finalCallbackDelivered = True
+            self._pending[session_id] = state
+            self._cond.notify()
+        return True
+
+    def initialize(self, session_id: str) -> SessionState:
+        state = new_session(session_id)
+        self.upsert(state)
+        return _clone(state)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._sweep_due or self._closing)
+                # Give concurrent requests a short window to join the batch.
+                self._cond.wait_for(
+                    lambda: len(self._pending) >= self._flush_batch_size or self._closing,
+                    timeout=self._flush_interval,
+                )
+                batch, self._pending = self._pending, {}
+                self._writing = batch
+                sweep = self._sweep_due
+                closing = self._closing
+            if batch and not self._write(batch) and closing:
+                logger.error("Dropping %s unsaved sessions at shutdown", len(batch))
+                return
+            if sweep:
+                self._expire()
+            with self._cond:
+                self._writing = {}
+                if sweep:
+                    self._sweep_due = False
+                self._cond.notify_all()
+                if closing and not self._pending:
+                    return
+
+    def _write(self, batch: Dict[str, SessionState]) -> bool:
+        now = time.time()
+        rows = [(session_id, state.model_dump_json(), now) for session_id, state in batch.items()]
+        try:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                self._writer.executemany(_UPSERT, rows)
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as exc:
+            logger.warning("Failed to persist %s sessions: %s", len(rows), exc)
+            # Retry on the next flush unless a newer state has been queued.
+            with self._cond:
+                for session_id, state in batch.items():
+                    self._pending.setdefault(session_id, state)
+            return False
+        self.flushes += 1
+        self.written += len(rows)
+        return True
+
+    def _expire(self) -> None:
+        try:
+            self._writer.execute(_EXPIRE, (self._cutoff(),))
+        except sqlite3.Error as exc:
+            logger.warning("Failed to expire idle sessions: %s", exc)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._writing and not self._sweep_due, timeout=timeout
+            )
+
+    def iter_sessions(self) -> Iterator[SessionState]:
+        if not self.flush():
+            logger.warning("Session flush timed out; iterating the last persisted states")
+        return _iter_rows(self._reader, self._read_lock, self._cutoff())
+
+    def sweep(self) -> None:
+        self._cache.sweep()
+        if self.ttl_seconds <= 0:
+            return
+        with self._cond:
+            self._sweep_due = True
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, int]:
+        totals = self._cache.stats()
+        with self._cond:
+            totals["pending"] = len(self._pending) + len(self._writing)
+        totals["dbReads"] = self.reads
+        totals["flushes"] = self.flushes
+        totals["written"] = self.written
+        return totals
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+        self._writer.close()
+        with self._read_lock:
+            self._reader.close()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class SharedSessionStore:
+    """
+    Session store that several worker processes on one host can share.
+
+    There is no in-process cache and no write-behind: every ``get`` reads the
+    row and every ``upsert`` commits before returning. Each row carries a
+    version, and an upsert only applies if the row still has the version the
+    state was read at. If another worker got there first, the two states are
+    combined with ``merge_states`` and the write is retried. Concurrent turns
+    on the same session therefore keep each other's extracted intelligence,
+    flags and counter increments. ``max_sessions`` is not enforced here; rows expire through
+    ``ttl_seconds``.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 0.0) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        _ensure_schema(self._conn)
+        self.reads = 0
+        self.written = 0
+        self.conflicts = 0
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+    def _select(self, session_id: str) -> Optional[SessionState]:
+        row = self._conn.execute(_SELECT, (session_id, self._cutoff())).fetchone()
+        self.reads += 1
+        return None if row is None else _parse(row)
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        with self._lock:
+            return self._select(session_id)
+
+    def upsert(self, state: SessionState) -> None:
+        with self._lock:
+            for _ in range(_CAS_ATTEMPTS):
+                now = time.time()
+                cursor = self._conn.execute(
+                    _COMPARE_AND_SWAP,
+                    (state.model_dump_json(), now, state.sessionId, state._version),
+                )
+                if cursor.rowcount:
+                    self.written += 1
+                    return
+                current = self._select(state.sessionId)
+                if current is None:
+                    # Expired or swept since it was read; start the row again.
+                    self._conn.execute(_UPSERT, (state.sessionId, state.model_dump_json(), now))
+                    self.written += 1
+                    return
+                self.conflicts += 1
+                state = merge_states(state, current)
+            logger.warning("Session %s kept changing; writing merged state", state.sessionId)
+            self._conn.execute(_UPSERT, (state.sessionId, state.model_dump_json(), time.time()))
+            self.written += 1
+
+    def mark_callback_delivered(self, session_id: str) -> bool:
+        # Sets only the flag and bumps the version, so a turn still holding
+        # the older version conflicts and merge_states keeps the flag.
+        with self._lock:
+            cursor = self._conn.execute(_MARK_DELIVERED, (session_id,))
+        return bool(cursor.rowcount)
+
+    def initialize(self, session_id: str) -> SessionState:
+        state = new_session(session_id)
+        with self._lock:
+            self._conn.execute(_INSERT, (session_id, state.model_dump_json(), time.time()))
+            # Another worker may have created it first; continue from theirs.
+            current = self._select(session_id)
+        return current if current is not None else state
+
+    def iter_sessions(self) -> Iterator[SessionState]:
+        return _iter_rows(self._conn, self._lock, self._cutoff())
+
+    def sweep(self) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._conn.execute(_EXPIRE, (self._cutoff(),))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"size": size, "dbReads": self.reads, "written": self.written, "conflicts": self.conflicts}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
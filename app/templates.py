@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Dict, Iterable, List
+
+# Template bank for the deterministic reply engine. Every body must keep the
+# same guarantees the LLM path enforces: ask for verification details with a
+# question, and never ask for (or hand over) secrets.
+
+_BODIES: Dict[str, List[str]] = {
+    "ASK_EMPLOYEE_ID_BRANCH": [
+        "Which branch are you calling from? Please tell your employee ID also.",
+        "Before I do anything, can you tell me your department and employee ID?",
+        "My branch never told me about this. Which branch and department is this?",
+    ],
+    "ASK_OFFICIAL_LINK_TICKET": [
+        "Is there any official link or ticket number for this?",
+        "Can you send the complaint reference number so I can check?",
+        "I can't find this on the official site. Can you share the link?",
+    ],
+    "CALL_BACK_CONFIRM_NUMBER": [
+        "Can I call you back? Which helpline number should I call?",
+        "What is the official helpline number? I will call and confirm.",
+        "Call is getting cut here. Which number can I call you back on?",
+    ],
+    "UPI_COLLECT_REQUEST_CHECK": [
+        "I didn't get any collect request. What is your UPI handle exactly?",
+        "Nothing is showing in my app. Which UPI ID should I check?",
+        "Request is not coming in my app. Can you send the UPI handle again?",
+    ],
+    "TECHNICAL_STALL_APP_ISSUE": [
+        "App is showing some error and not opening. Is there any official link I can use instead?",
+        "Network is very bad here, app keeps loading. Can you give a reference number so I can try later?",
+        "My app got logged out suddenly. Which branch should I visit to fix this?",
+    ],
+    "TECHNICAL_STALL_PIN_ISSUE": [
+        "No OTP has come yet, app is stuck on the PIN screen. Can you give the reference number for this?",
+        "PIN screen came and then error. Is there a ticket number for this issue?",
+        "OTP is not coming on my phone. Which department is handling this, what is the helpline?",
+    ],
+}
+
+# Openers keyed by the early-turn / stress flags, plus extra lead-ins per intent.
+_INTENT_LEADS: Dict[str, List[str]] = {
+    "pretend_technical_issue": ["Sorry, one minute, "],
+}
+
+_EARLY_OPENERS = ["", "Sorry sir, ", "Hello ma'am, "]
+_STRESS_OPENERS = ["Please, I'm getting scared now, ", "Sir please, I'm worried, "]
+_DEFAULT_OPENERS = ["", "Ok, "]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "", (text or "").lower())
+
+
+def _join(opener: str, body: str) -> str:
+    if not opener:
+        return body
+    # Keep acronyms (OTP, PIN, UPI) intact; only soften ordinary first words.
+    if len(body) > 1 and body[1].islower():
+        body = body[0].lower() + body[1:]
+    return opener + body
+
+
+def _openers(next_intent: str, early_turn: bool, stress_score_high: bool) -> List[str]:
+    if stress_score_high:
+        base = _STRESS_OPENERS
+    elif early_turn:
+        base = _EARLY_OPENERS
+    else:
+        base = _DEFAULT_OPENERS
+    return base + _INTENT_LEADS.get(next_intent, [])
+
+
+def render_template_reply(
+    strategy: str,
+    session_id: str,
+    turn: int,
+    next_intent: str = "clarify_procedure",
+    early_turn: bool = False,
+    stress_score_high: bool = False,
+    avoid: Iterable[str] = (),
+) -> str:
+    bodies = _BODIES.get(strategy) or _BODIES["ASK_OFFICIAL_LINK_TICKET"]
+    openers = _openers(next_intent, early_turn, stress_score_high)
+    avoided = {_normalize(text) for text in avoid if text}
+
+    # Rotation is seeded per session so concurrent sessions drift apart, and
+    # advanced per turn so one session does not repeat itself.
+    seed = zlib.crc32(session_id.encode("utf-8"))
+    total = len(bodies) * len(openers)
+    for offset in range(total):
+        body = bodies[(seed + turn + offset) % len(bodies)]
+        opener = openers[(seed + turn + offset // len(bodies)) % len(openers)]
+        reply = _join(opener, body)
+        if _normalize(reply) not in avoided:
+            return reply
+
+    return _join(openers[0], bodies[(seed + turn) % len(bodies)])
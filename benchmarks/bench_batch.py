@@ -0,0 +1,60 @@
+"""Batch detector and extractor throughput.
+
+Times ``detect_scam_intent`` plus ``extract_intelligence`` called once per
+message against ``detect_scam_intent_batch`` plus
+``extract_intelligence_batch``, in process and with a process pool of one
+worker per CPU.
+
+    python -m benchmarks.bench_batch [messages]
+"""
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+
+from app.batch import detect_scam_intent_batch, extract_intelligence_batch
+from app.detector import detect_scam_intent
+from app.extract import extract_intelligence
+
+_PARTS = (
+    "your account is blocked",
+    "share the otp to verify",
+    "pay the fine via upi to police@okaxis",
+    "call +91 98765 43210 immediately",
+    "click https://kyc-update.example/login",
+    "transfer to account 1234 5678 9012",
+    "are we still meeting for lunch tomorrow",
+    "the train is delayed by twenty minutes",
+)
+
+
+def _rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:>12,.0f} msg/s"
+
+
+def main(count: int) -> None:
+    rng = random.Random(5)
+    texts = [" ".join(rng.sample(_PARTS, 3)) for _ in range(count)]
+
+    start = time.perf_counter()
+    for text in texts:
+        detect_scam_intent(text)
+        extract_intelligence(text)
+    print(f"{'per message':<24}{_rate(count, time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    detect_scam_intent_batch(texts)
+    extract_intelligence_batch(texts)
+    print(f"{'batch':<24}{_rate(count, time.perf_counter() - start)}")
+
+    processes = os.cpu_count() or 1
+    start = time.perf_counter()
+    detect_scam_intent_batch(iter(texts), processes=processes)
+    extract_intelligence_batch(iter(texts), processes=processes)
+    print(f"{f'batch, {processes} processes':<24}{_rate(count, time.perf_counter() - start)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
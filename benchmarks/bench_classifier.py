@@ -0,0 +1,57 @@
+"""Classifier scoring latency, single and batched.
+
+Trains a small model on a synthetic corpus, then times ``score`` per message
+and ``score_batch`` per message at a few message lengths. The target is under
+100 us per message on the single-message path. Requires numpy.
+
+    python -m benchmarks.bench_classifier [messages]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from app.classifier import train
+
+_SCAM = (
+    "your account is blocked share the otp to verify",
+    "pay the refund processing fee via upi now",
+    "kyc expired click the link immediately",
+    "police cyber cell pay the fine or face arrest",
+)
+_HAM = (
+    "are we still meeting for lunch tomorrow",
+    "thanks for the update see you at the station",
+    "can you send me the report by friday",
+    "the train is delayed by twenty minutes",
+)
+
+
+def _text(rng: random.Random, words: int, scam: bool) -> str:
+    pool = " ".join(_SCAM if scam else _HAM).split()
+    return " ".join(rng.choice(pool) for _ in range(words))
+
+
+def main(count: int) -> None:
+    rng = random.Random(11)
+    labels = [rng.random() < 0.5 for _ in range(2000)]
+    model = train([_text(rng, 12, label) for label in labels], labels, epochs=3)
+    print(f"{'words':>6}{'chars':>7}{'score (us)':>12}{'batch (us/msg)':>16}")
+    for words in (8, 25, 60):
+        texts = [_text(rng, words, rng.random() < 0.5) for _ in range(count)]
+        for text in texts[:100]:
+            model.score(text)
+        start = time.perf_counter()
+        for text in texts:
+            model.score(text)
+        single = (time.perf_counter() - start) / count * 1e6
+        start = time.perf_counter()
+        model.score_batch(texts)
+        batch = (time.perf_counter() - start) / count * 1e6
+        chars = sum(len(text) for text in texts) // count
+        print(f"{words:>6}{chars:>7}{single:>12.1f}{batch:>16.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
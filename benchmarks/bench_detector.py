@@ -0,0 +1,68 @@
+"""Keyword scoring cost as the lexicon grows.
+
+Scores the same messages against synthetic lexicons of increasing size, once
+with one substring test per keyword (the previous detector loop) and once
+with ``KeywordMatcher``. Both must find identical keyword sets.
+
+    python -m benchmarks.bench_detector [messages]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from app.detector import _SCAM_KEYWORDS
+from app.matcher import KeywordMatcher
+
+_SYLLABLES = ("ka", "ro", "mi", "tu", "se", "na", "vi", "lo", "pe", "da", "zu", "ch", "an", "ex")
+_FILLER = "please sir this is regarding your recent request and we need you to respond today "
+
+
+def _lexicon(size: int, rng: random.Random) -> dict:
+    lexicon = dict(_SCAM_KEYWORDS)
+    while len(lexicon) < size:
+        words = ["".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(rng.randint(1, 3))]
+        lexicon[" ".join(words)] = round(rng.uniform(0.05, 0.25), 2)
+    return lexicon
+
+
+def _messages(lexicon: dict, count: int, rng: random.Random) -> list:
+    keywords = list(lexicon)
+    messages = []
+    for _ in range(count):
+        parts = [_FILLER[: rng.randint(20, len(_FILLER))]]
+        parts.extend(rng.choice(keywords) for _ in range(rng.randint(0, 4)))
+        rng.shuffle(parts)
+        messages.append(" ".join(parts))
+    return messages
+
+
+def _loop(lexicon: dict, text: str) -> set:
+    return {keyword for keyword in lexicon if keyword in text}
+
+
+def main(count: int) -> None:
+    rng = random.Random(7)
+    print(f"{'keywords':>9}{'loop (us/msg)':>16}{'matcher (us/msg)':>19}{'build (ms)':>12}")
+    for size in (25, 250, 2500, 10000):
+        lexicon = _lexicon(size, rng)
+        messages = _messages(lexicon, count, rng)
+        start = time.perf_counter()
+        matcher = KeywordMatcher(lexicon)
+        build = time.perf_counter() - start
+        for text in messages[:200]:
+            assert matcher.find(text) == _loop(lexicon, text)
+        start = time.perf_counter()
+        for text in messages:
+            _loop(lexicon, text)
+        loop = (time.perf_counter() - start) / count * 1e6
+        start = time.perf_counter()
+        for text in messages:
+            matcher.find(text)
+        matched = (time.perf_counter() - start) / count * 1e6
+        print(f"{size:>9}{loop:>16.1f}{matched:>19.1f}{build * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
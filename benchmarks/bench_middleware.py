@@ -0,0 +1,120 @@
+"""Per-request overhead of the /message body guard.
+
+Compares the pure ASGI ``TesterBodyGuard`` against the previous
+``@app.middleware("http")`` (BaseHTTPMiddleware) wiring of the same guard
+logic, calling both ASGI apps in-process so only framework overhead is timed.
+
+    python -m benchmarks.bench_middleware [iterations]
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault("HONEY_POT_API_KEY", "bench-key")
+os.environ["OPENAI_API_KEY"] = ""
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app import main  # noqa: E402
+
+API_KEY = os.environ["HONEY_POT_API_KEY"].encode()
+MESSAGE_BODY = json.dumps(
+    {
+        "sessionId": "bench",
+        "message": {"sender": "user", "text": "Hello, who is this?", "timestamp": "2026-02-02T10:00:00Z"},
+        "conversationHistory": [],
+    }
+).encode()
+
+SCENARIOS = [
+    ("GET /", "GET", "/", b"", []),
+    ("HEAD /message", "HEAD", "/message", b"", []),
+    ("POST /message bad key", "POST", "/message", MESSAGE_BODY, [(b"x-api-key", b"nope")]),
+    ("POST /message empty text", "POST", "/message", b'{"message": {"text": ""}}', [(b"x-api-key", API_KEY)]),
+    ("POST /message handler", "POST", "/message", MESSAGE_BODY, [(b"x-api-key", API_KEY)]),
+]
+
+
+async def _legacy_guard(request, call_next):
+    if request.url.path == "/message" and request.method.upper() == "POST":
+        body = await request.body()
+        response = main._guard_response(request.headers, body, request.scope.setdefault("state", {}))
+        if response is not None:
+            return response
+    return await call_next(request)
+
+
+def _legacy_app() -> FastAPI:
+    legacy = FastAPI(docs_url=None, redoc_url=None)
+    legacy.router = main.app.router
+    legacy.exception_handlers = dict(main.app.exception_handlers)
+    legacy.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    legacy.add_middleware(BaseHTTPMiddleware, dispatch=_legacy_guard)
+    return legacy
+
+
+async def _call(app, method: str, path: str, body: bytes, headers) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), *headers],
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 8000),
+    }
+    sent = False
+    status = 0
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _bench(app, scenario, iterations: int) -> float:
+    _, method, path, body, headers = scenario
+    for _ in range(50):
+        await _call(app, method, path, body, headers)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await _call(app, method, path, body, headers)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def _run(iterations: int) -> None:
+    main._load_settings()
+    legacy = _legacy_app()
+    print(f"{'scenario':<28}{'before (us)':>14}{'after (us)':>14}{'saved':>10}")
+    for scenario in SCENARIOS:
+        before = await _bench(legacy, scenario, iterations)
+        after = await _bench(main.app, scenario, iterations)
+        print(f"{scenario[0]:<28}{before:>14.1f}{after:>14.1f}{(before - after) / before:>10.0%}")
+    main._shutdown()
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(_run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
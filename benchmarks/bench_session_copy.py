@@ -0,0 +1,81 @@
+"""Cost of the copy a session store hands back to each request.
+
+Compares ``model_copy(deep=True)`` with the container-only clone used by the
+SQLite store's cache path, and with expanding the in-memory store's compact
+record, on sessions of growing size. It reports time per copy, and bytes
+allocated per copy as measured by tracemalloc.
+
+    python -m benchmarks.bench_session_copy [iterations]
+"""
+from __future__ import annotations
+
+import sys
+import time
+import tracemalloc
+
+from app.compact import from_compact, to_compact
+from app.models import SessionState
+from app.store import SessionStore, _clone
+
+
+def _session(items: int) -> SessionState:
+    store = SessionStore(shards=1)
+    state = store.initialize("bench")
+    intel = state.extractedIntelligence
+    for i in range(items):
+        intel.bankAccounts.append(f"{1234567890123 + i}")
+        intel.upiIds.append(f"payee{i}@okbank")
+        intel.phishingLinks.append(f"http://secure-verify-{i}.example.com/login")
+        intel.phoneNumbers.append(f"+9198765{i:05d}")
+        intel.suspiciousKeywords.append(f"keyword {i}")
+    state.recentScammer = [f"Scammer message number {i}, send the OTP now" for i in range(min(items, 5))]
+    state.recentHoneypot = [f"Honeypot reply number {i}, which app?" for i in range(min(items, 5))]
+    return state
+
+
+def _allocated(copy, state, iterations: int) -> float:
+    tracemalloc.start()
+    total = 0
+    for _ in range(iterations):
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        copied = copy(state)
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - start
+        del copied
+    tracemalloc.stop()
+    return total / iterations
+
+
+def _timed(copy, state, iterations: int) -> float:
+    for _ in range(100):
+        copy(state)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        copy(state)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(iterations: int) -> None:
+    deep = lambda state: state.model_copy(deep=True)  # noqa: E731
+    header = f"{'items/list':>11}{'deep (us)':>12}{'clone (us)':>12}{'compact (us)':>14}"
+    print(header + f"{'deep (B)':>12}{'clone (B)':>12}{'compact (B)':>13}")
+    for items in (0, 10, 100, 1000):
+        state = _session(items)
+        compact = to_compact(state)
+        times = [
+            _timed(deep, state, iterations),
+            _timed(_clone, state, iterations),
+            _timed(from_compact, compact, iterations),
+        ]
+        allocated = [
+            _allocated(deep, state, max(1, iterations // 10)),
+            _allocated(_clone, state, max(1, iterations // 10)),
+            _allocated(from_compact, compact, max(1, iterations // 10)),
+        ]
+        row = f"{items:>11}{times[0]:>12.1f}{times[1]:>12.1f}{times[2]:>14.1f}"
+        print(row + f"{allocated[0]:>12.0f}{allocated[1]:>12.0f}{allocated[2]:>13.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,68 @@
+"""Memory held by stored sessions: pydantic models vs compact records.
+
+Builds the same mid-conversation sessions once as ``SessionState`` models and
+once as the ``CompactSession`` records the store keeps. It reports bytes
+allocated per session, and the total, as measured by tracemalloc.
+
+    python -m benchmarks.bench_session_memory [sessions]
+"""
+from __future__ import annotations
+
+import gc
+import sys
+import tracemalloc
+
+from app.compact import to_compact
+from app.models import Intelligence, SessionState
+
+_KEYWORDS = ("urgent", "otp", "blocked", "verify", "kyc", "account")
+
+
+def _state(i: int) -> SessionState:
+    # Strings are built per session, as they would arrive from requests.
+    return SessionState(
+        sessionId=f"session-{i:08d}",
+        scamScore=0.8,
+        scamConfirmed=True,
+        agentActive=True,
+        totalMessagesExchanged=6,
+        lastReply=f"Which branch is this, sir? Ref {i}",
+        extractedIntelligence=Intelligence(
+            bankAccounts=[],
+            upiIds=[f"payee{i}@okbank"],
+            phishingLinks=[],
+            phoneNumbers=[f"+9198{i:08d}"],
+            suspiciousKeywords=["".join(k) for k in _KEYWORDS[: 2 + i % 3]],
+        ),
+        lastScammerMessage=f"Send the OTP now or account {i} is blocked",
+        agentNotes="Scammer pushed urgency and asked for OTP.",
+        missingSlots=["phishing", "bank"],
+        recentScammer=[f"Message {n} from scammer {i}" for n in range(3)],
+        recentHoneypot=[f"Reply {n} to scammer {i}" for n in range(3)],
+    )
+
+
+def _measure(build, sessions: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    held = {}
+    for i in range(sessions):
+        held[i] = build(i)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    gc.collect()
+    return current
+
+
+def main(sessions: int) -> None:
+    model = _measure(_state, sessions)
+    compact = _measure(lambda i: to_compact(_state(i)), sessions)
+    print(f"{'representation':<16}{'bytes/session':>16}{'total (MiB)':>14}")
+    print(f"{'SessionState':<16}{model / sessions:>16.0f}{model / 2**20:>14.1f}")
+    print(f"{'CompactSession':<16}{compact / sessions:>16.0f}{compact / 2**20:>14.1f}")
+    print(f"saved {(model - compact) / model:.0%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
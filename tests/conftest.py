@@ -0,0 +1,21 @@
+import pytest
+
+from app.config import load_settings
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    for name, value in {
+        "HONEY_POT_API_KEY": "test-key",
+        "OUTBOX_PATH": str(tmp_path / "outbox.db"),
+        "FINAL_CALLBACK_URL": "http://callback.test/final",
+        "CALLBACK_MAX_ATTEMPTS": "3",
+        "CALLBACK_BACKOFF_BASE_SECONDS": "1",
+        "CALLBACK_BACKOFF_MAX_SECONDS": "10",
+        "CALLBACK_BREAKER_THRESHOLD": "2",
+        "CALLBACK_BREAKER_RESET_SECONDS": "30",
+        "CALLBACK_BATCH_SIZE": "1",
+        "CALLBACK_BATCH_URL": "",
+    }.items():
+        monkeypatch.setenv(name, value)
+    return load_settings()
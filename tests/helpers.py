@@ -0,0 +1,13 @@
+from app.models import FinalCallbackPayload, Intelligence
+
+
+def make_payload(session_id: str) -> FinalCallbackPayload:
+    return FinalCallbackPayload(
+        sessionId=session_id,
+        scamDetected=True,
+        totalMessagesExchanged=4,
+        extractedIntelligence=Intelligence(
+            bankAccounts=[], upiIds=["x@okaxis"], phishingLinks=[], phoneNumbers=[], suspiciousKeywords=[]
+        ),
+        agentNotes="",
+    )
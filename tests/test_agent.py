@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import agent
+from app.store import new_session
+
+
+def test_abandoned_turn_counts_until_worker_finishes(monkeypatch):
+    release = threading.Event()
+
+    def slow_reply(state, scammer_text, *args, **kwargs):
+        release.wait(5)
+        return agent.build_template_reply(state, scammer_text)
+
+    monkeypatch.setattr(agent, "OpenAI", object())
+    monkeypatch.setattr(agent, "build_agent_reply", slow_reply)
+    monkeypatch.setattr(agent, "_pending_turns", 0)
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def turn(max_pending):
+        return await agent.build_agent_reply_async(
+            new_session("s1"),
+            "share otp",
+            [],
+            "key",
+            "model",
+            executor=executor,
+            max_pending=max_pending,
+            deadline=time.monotonic() + 0.05,
+        )
+
+    try:
+        asyncio.run(turn(0))
+        # The request gave up, but the worker still occupies the pool.
+        assert agent._pending_turns == 1
+        monkeypatch.setattr(agent, "build_agent_reply", lambda *args, **kwargs: None)
+        assert asyncio.run(turn(1)) is not None
+        assert agent._pending_turns == 1
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+    assert agent._pending_turns == 0
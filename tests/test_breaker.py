@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import breaker
+from app.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(breaker, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    circuit = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    circuit.record_failure()
+    circuit.record_failure()
+    circuit.record_success()
+    circuit.record_failure()
+    circuit.record_failure()
+    assert circuit.state == CLOSED
+    circuit.record_failure()
+    assert circuit.state == OPEN
+    assert not circuit.allow()
+    assert circuit.retry_after() == 10
+    assert circuit.stats()["rejected"] == 1
+
+
+def test_half_open_probe_closes_or_reopens(clock):
+    circuit = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    circuit.record_failure()
+    clock[0] += 10
+    assert circuit.state == HALF_OPEN
+    assert circuit.allow()
+    assert not circuit.allow()
+    circuit.record_failure()
+    assert circuit.state == OPEN
+    assert circuit.stats()["opened"] == 2
+
+    clock[0] += 10
+    assert circuit.allow()
+    circuit.record_success()
+    assert circuit.state == CLOSED
+    assert circuit.allow() and circuit.allow()
+
+
+def test_retry_after_counts_down(clock):
+    circuit = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    circuit.record_failure()
+    clock[0] += 12
+    assert circuit.retry_after() == 18
+    clock[0] += 20
+    assert circuit.retry_after() == 0
+
+
+def test_retry_after_waits_for_outstanding_probes(clock):
+    circuit = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    circuit.record_failure()
+    clock[0] += 10
+    assert circuit.retry_after() == 0
+    assert circuit.allow()
+    clock[0] += 4
+    assert circuit.retry_after() == 6
+    assert not circuit.allow()
+    # A probe that never reports back frees its slot after reset_timeout.
+    clock[0] += 6
+    assert circuit.retry_after() == 0
+    assert circuit.allow()
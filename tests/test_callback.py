@@ -0,0 +1,67 @@
+import asyncio
+import dataclasses
+
+import httpx
+import pytest
+
+from app.callback import send_final_callback_batch
+from tests.helpers import make_payload
+
+
+def _send(settings, response):
+    payloads = [make_payload("a"), make_payload("b")]
+    settings = dataclasses.replace(settings, callback_batch_url="http://callback.test/batch")
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: response))
+
+    async def scenario():
+        async with client:
+            return await send_final_callback_batch(payloads, settings, client)
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("response", [httpx.Response(200), httpx.Response(204), httpx.Response(200, text="OK")])
+def test_empty_or_non_json_body_acks_everything(settings, response):
+    assert _send(settings, response) == [True, True]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"results": [{"sessionId": "a", "ok": True}, {"sessionId": "b", "ok": False}]},
+        [{"sessionId": "a", "ok": True}, {"sessionId": "b", "ok": False}],
+    ],
+)
+def test_per_item_results(settings, body):
+    assert _send(settings, httpx.Response(200, json=body)) == [True, False]
+
+
+@pytest.mark.parametrize("body", ['{"status": "accepted"}', '{"results": "partial"}', "7", "null"])
+def test_unrecognised_json_acks_nothing(settings, body):
+    response = httpx.Response(200, text=body, headers={"Content-Type": "application/json"})
+    assert _send(settings, response) == [False, False]
+
+
+def test_error_status_acks_nothing(settings):
+    assert _send(settings, httpx.Response(503)) == [False, False]
+
+
+def test_pipelined_items_stay_within_the_connection_cap(settings):
+    settings = dataclasses.replace(settings, callback_max_inflight=2)
+    payloads = [make_payload(str(index)) for index in range(6)]
+    active, peak = 0, 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return httpx.Response(200)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await send_final_callback_batch(payloads, settings, client)
+
+    assert asyncio.run(scenario()) == [True] * 6
+    assert peak == 2
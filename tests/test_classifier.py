@@ -0,0 +1,49 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app import classifier  # noqa: E402
+from app.classifier import LinearClassifier, train  # noqa: E402
+
+_TEXTS = ["share the otp to unblock your account", "see you at lunch tomorrow"] * 20
+_LABELS = [True, False] * 20
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = str(tmp_path / "model.npz")
+    train(_TEXTS, _LABELS, hash_bits=12, epochs=2).save(path)
+    return path
+
+
+def test_save_load_round_trip(model_path):
+    model = LinearClassifier.load(model_path)
+    assert model.hash_bits == 12
+    assert model.score(_TEXTS[0]) > model.score(_TEXTS[1])
+
+
+@pytest.mark.parametrize("keep", [0.1, 0.5, 0.95])
+def test_truncated_model_raises_value_error(model_path, tmp_path, keep):
+    with open(model_path, "rb") as handle:
+        data = handle.read()
+    truncated = tmp_path / "truncated.npz"
+    truncated.write_bytes(data[: int(len(data) * keep)])
+    with pytest.raises(ValueError):
+        LinearClassifier.load(str(truncated))
+
+
+def test_power_tables_grow_together(monkeypatch):
+    monkeypatch.setattr(classifier, "_tables", (np.ones(1, dtype=np.uint64), np.ones(1, dtype=np.uint64)))
+    powers, inverse_powers = classifier._power_tables(5000)
+    assert len(powers) == len(inverse_powers) >= 5000
+    assert int(powers[3]) * int(inverse_powers[3]) % (1 << 64) == 1
+
+
+@pytest.mark.parametrize("holdout, rows", [("1", 4), ("-0.5", 4), ("0.1", 0)])
+def test_train_rejects_an_empty_training_split(tmp_path, capsys, holdout, rows):
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text('{"text": "share the otp", "label": 1}\n' * rows)
+    with pytest.raises(SystemExit) as exit_info:
+        classifier.main(["train", str(corpus), str(tmp_path / "model.npz"), "--holdout", holdout])
+    assert exit_info.value.code == 2
+    assert "error:" in capsys.readouterr().err
@@ -0,0 +1,25 @@
+import json
+
+import pytest
+
+from app import detector
+from app.lexicon import load_pack, pack_checksum
+
+
+def _write_pack(path, keywords):
+    pack = {"name": "test", "version": "1", "keywords": keywords, "sha256": pack_checksum(keywords)}
+    path.write_text(json.dumps(pack))
+    return str(path)
+
+
+@pytest.mark.parametrize("weight", [True, 0, 1.5, "0.5"])
+def test_rejects_invalid_weights(tmp_path, weight):
+    with pytest.raises(ValueError):
+        load_pack(_write_pack(tmp_path / "pack.json", {"gift card": weight}))
+
+
+def test_missing_directory_counts_as_reload_failure(tmp_path):
+    failures = detector.lexicon_stats()["reloadFailures"]
+    with pytest.raises(OSError):
+        detector.reload_lexicon(str(tmp_path / "missing"))
+    assert detector.lexicon_stats()["reloadFailures"] == failures + 1
@@ -0,0 +1,17 @@
+import pytest
+
+from app import matcher
+from app.matcher import KeywordMatcher
+
+_WEIGHTS = {"otp": 0.3, "otp code": 0.2, "account": 0.1, "count": 0.05, "verify": 0.2, "bank account": 0.25}
+_TEXTS = ["", "share the otp code", "verify your bank account", "no keywords here", "otpotp discount"]
+
+
+@pytest.mark.parametrize("text", _TEXTS)
+def test_regex_scan_matches_substring_scan(monkeypatch, text):
+    small = KeywordMatcher(_WEIGHTS)
+    monkeypatch.setattr(matcher, "_REGEX_MIN_KEYWORDS", 1)
+    large = KeywordMatcher(_WEIGHTS)
+    assert small._pattern is None and large._pattern is not None
+    assert large.find(text) == small.find(text)
+    assert large.score(text) == small.score(text)
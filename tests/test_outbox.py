@@ -0,0 +1,226 @@
+import asyncio
+import dataclasses
+import sqlite3
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.outbox import CallbackOutbox
+from tests.helpers import make_payload
+
+delivered = []
+
+
+@pytest.fixture(autouse=True)
+def _reset_delivered():
+    delivered.clear()
+
+
+def _outbox(settings, handler, **changes):
+    outbox = CallbackOutbox(dataclasses.replace(settings, **changes), on_delivered=delivered.append)
+    outbox._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return outbox
+
+
+def _row(outbox, session_id):
+    return outbox._conn.execute(
+        "SELECT attempts, next_attempt_at, lease_until, last_error FROM outbox WHERE session_id = ?", (session_id,)
+    ).fetchone()
+
+
+def _make_due(outbox):
+    outbox._conn.execute("UPDATE outbox SET next_attempt_at = 0, lease_until = 0")
+
+
+async def _attempt(outbox):
+    rows = await outbox._claim_due(10)
+    if rows:
+        await outbox._deliver(rows)
+    return rows
+
+
+def test_ack_deletes_row_and_reports_delivery(settings):
+    outbox = _outbox(settings, lambda request: httpx.Response(200))
+
+    async def scenario():
+        await outbox.enqueue(make_payload("s1"))
+        assert len(await _attempt(outbox)) == 1
+
+    asyncio.run(scenario())
+    assert delivered == ["s1"]
+    assert outbox.stats()["pending"] == 0
+    assert outbox.stats()["delivered"] == 1
+
+
+def test_failure_backs_off_and_dead_letters_after_max_attempts(settings):
+    outbox = _outbox(settings, lambda request: httpx.Response(500), callback_breaker_threshold=10)
+
+    async def scenario():
+        await outbox.enqueue(make_payload("s1"))
+        before = time.time()
+        await _attempt(outbox)
+        attempts, next_attempt_at, lease_until, error = _row(outbox, "s1")
+        assert attempts == 1 and lease_until == 0 and error
+        # Jittered between half and all of the base delay.
+        assert before + 0.5 <= next_attempt_at <= time.time() + 1.0
+        assert await outbox._claim_due(10) == []
+
+        for _ in range(settings.callback_max_attempts - 1):
+            _make_due(outbox)
+            await _attempt(outbox)
+
+    asyncio.run(scenario())
+    stats = outbox.stats()
+    assert (stats["pending"], stats["deadLetter"], stats["deadLettered"]) == (0, 1, 1)
+    assert delivered == []
+
+    assert asyncio.run(outbox.replay_dead_letters()) == 1
+    assert outbox.stats()["pending"] == 1
+    assert _row(outbox, "s1")[0] == 0
+
+
+def test_claimed_rows_are_leased_to_one_worker(settings):
+    first = CallbackOutbox(settings)
+    second = CallbackOutbox(settings)
+
+    async def scenario():
+        await first.enqueue(make_payload("s1"))
+        assert len(await first._claim_due(10)) == 1
+        assert await second._claim_due(10) == []
+        # A crashed worker's lease runs out and the row is claimable again.
+        first._conn.execute("UPDATE outbox SET lease_until = ?", (time.time() - 1,))
+        assert len(await second._claim_due(10)) == 1
+
+    asyncio.run(scenario())
+
+
+def test_rows_in_flight_are_not_reclaimed_after_lease_expiry(settings):
+    outbox = CallbackOutbox(settings)
+
+    async def scenario():
+        await outbox.enqueue(make_payload("s1"))
+        await outbox.enqueue(make_payload("s2"))
+        assert [row[1] for row in await outbox._claim_due(1)] == ["s1"]
+        _make_due(outbox)
+        assert [row[1] for row in await outbox._claim_due(10)] == ["s2"]
+
+    asyncio.run(scenario())
+
+
+def test_lease_covers_queued_pipelined_items(settings):
+    single = CallbackOutbox(settings)
+    batched = CallbackOutbox(dataclasses.replace(settings, callback_batch_size=8))
+    assert batched._lease_seconds() > 8 * settings.http_timeout_seconds > single._lease_seconds()
+
+
+def test_open_circuit_defers_without_spending_attempts(settings):
+    outbox = _outbox(settings, lambda request: httpx.Response(503))
+
+    async def scenario():
+        for session_id in ("a", "b", "c"):
+            await outbox.enqueue(make_payload(session_id))
+        for _ in range(settings.callback_breaker_threshold):
+            rows = await outbox._claim_due(1)
+            await outbox._deliver(rows)
+        assert outbox.stats()["breaker"]["state"] == "open"
+        rows = await outbox._claim_due(1)
+        await outbox._deliver(rows)
+        return rows[0][1]
+
+    deferred = asyncio.run(scenario())
+    attempts, next_attempt_at, lease_until, _ = _row(outbox, deferred)
+    assert attempts == 0 and lease_until == 0
+    assert next_attempt_at > time.time() + settings.callback_breaker_reset_seconds - 5
+
+
+def test_rows_rejected_during_a_probe_wait_for_it(settings):
+    outbox = _outbox(settings, lambda request: httpx.Response(200))
+    outbox._breaker.record_failure()
+    outbox._breaker.record_failure()
+    outbox._breaker._opened_at -= settings.callback_breaker_reset_seconds
+    assert outbox._breaker.allow()
+
+    async def scenario():
+        await outbox.enqueue(make_payload("s1"))
+        await outbox._deliver(await outbox._claim_due(1))
+
+    asyncio.run(scenario())
+    attempts, next_attempt_at, _, _ = _row(outbox, "s1")
+    assert attempts == 0
+    assert next_attempt_at > time.time() + settings.callback_breaker_reset_seconds - 5
+
+
+def test_batch_acks_only_items_reported_ok(settings):
+    def handler(request):
+        return httpx.Response(200, json={"results": [{"sessionId": "a", "ok": True}, {"sessionId": "b", "ok": False}]})
+
+    outbox = _outbox(
+        settings,
+        handler,
+        callback_batch_size=2,
+        callback_batch_window_ms=0,
+        callback_batch_url="http://callback.test/batch",
+    )
+
+    async def scenario():
+        await outbox.enqueue(make_payload("a"))
+        await outbox.enqueue(make_payload("b"))
+        rows = await outbox._claim_batch()
+        assert len(rows) == 2
+        await outbox._deliver(rows)
+
+    asyncio.run(scenario())
+    assert delivered == ["a"]
+    assert _row(outbox, "a") is None
+    assert _row(outbox, "b")[0] == 1
+
+
+def test_enqueue_does_not_block_the_event_loop(settings):
+    outbox = CallbackOutbox(settings)
+    locked = threading.Event()
+    release = threading.Event()
+
+    def hold_write_lock():
+        conn = sqlite3.connect(settings.outbox_path, isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        locked.set()
+        release.wait(5)
+        conn.execute("COMMIT")
+        conn.close()
+
+    holder = threading.Thread(target=hold_write_lock)
+    holder.start()
+    locked.wait(5)
+
+    async def scenario():
+        ticks = 0
+        enqueue = asyncio.create_task(outbox.enqueue(make_payload("s1")))
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        release.set()
+        await enqueue
+        return ticks
+
+    try:
+        assert asyncio.run(scenario()) == 20
+    finally:
+        release.set()
+        holder.join()
+    assert outbox.stats()["pending"] == 1
+    outbox.close()
+
+
+def test_delivery_hook_runs_off_the_event_loop(settings):
+    threads = []
+    outbox = CallbackOutbox(settings, on_delivered=lambda session_id: threads.append(threading.get_ident()))
+    outbox._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+
+    async def scenario():
+        await outbox.enqueue(make_payload("s1"))
+        await _attempt(outbox)
+
+    asyncio.run(scenario())
+    assert threads and threads[0] != threading.get_ident()
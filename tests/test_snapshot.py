@@ -0,0 +1,63 @@
+import pytest
+
+from app.snapshot import dump_snapshot, load_snapshot
+from app.store import SessionStore
+from app.store_sqlite import SQLiteSessionStore
+
+
+def _store_with(sessions):
+    store = SessionStore(shards=1)
+    for session_id, messages in sessions.items():
+        state = store.initialize(session_id)
+        state.totalMessagesExchanged = messages
+        state.extractedIntelligence.upiIds.append(f"{session_id}@okaxis")
+        store.upsert(state)
+    return store
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "sessions.jsonl")
+    source = _store_with({"a": 2, "b": 5})
+    assert dump_snapshot(source, path) == 2
+
+    target = SessionStore(shards=1)
+    assert load_snapshot(target, path) == 2
+    assert target.get("a") == source.get("a")
+    assert target.get("b").extractedIntelligence.upiIds == ["b@okaxis"]
+
+
+def test_round_trip_gzip(tmp_path):
+    path = str(tmp_path / "sessions.jsonl.gz")
+    dump_snapshot(_store_with({"a": 3}), path)
+    with open(path, "rb") as handle:
+        assert handle.read(2) == b"\x1f\x8b"
+    target = SessionStore(shards=1)
+    load_snapshot(target, path)
+    assert target.get("a").totalMessagesExchanged == 3
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "sessions.jsonl"
+    path.write_text('{"format": "something-else"}\n')
+    with pytest.raises(ValueError):
+        load_snapshot(SessionStore(), str(path))
+
+
+def test_does_not_overwrite_newer_rows(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    snapshot_path = str(tmp_path / "sessions.jsonl")
+    store = SQLiteSessionStore(db_path)
+    state = store.initialize("s1")
+    state.totalMessagesExchanged = 4
+    store.upsert(state)
+    dump_snapshot(store, snapshot_path)
+    state.totalMessagesExchanged = 12
+    store.upsert(state)
+    store.close()
+
+    restarted = SQLiteSessionStore(db_path)
+    try:
+        assert load_snapshot(restarted, snapshot_path) == 0
+        assert restarted.get("s1").totalMessagesExchanged == 12
+    finally:
+        restarted.close()
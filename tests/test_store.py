@@ -0,0 +1,54 @@
+import time
+
+from app.store import SessionStore
+
+
+def test_finished_sessions_are_evicted_first():
+    store = SessionStore(shards=1, max_sessions=2)
+    for session_id in ("done", "a"):
+        state = store.initialize(session_id)
+        state.terminated = True
+        store.upsert(state)
+    store.mark_callback_delivered("done")
+    store.initialize("b")
+    assert store.get("done") is None
+    assert store.get("a") is not None
+    assert store.stats()["evictedFinished"] == 1
+
+
+def test_least_recently_used_is_evicted_without_finished_sessions():
+    store = SessionStore(shards=1, max_sessions=2)
+    store.initialize("a")
+    store.initialize("b")
+    store.get("a")
+    store.initialize("c")
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.stats()["evictedLru"] == 1
+
+
+def test_idle_sessions_expire():
+    store = SessionStore(shards=1, ttl_seconds=0.05)
+    store.initialize("a")
+    time.sleep(0.1)
+    assert store.get("a") is None
+    assert store.stats()["expired"] == 1
+
+
+def test_stale_turn_keeps_delivered_flag():
+    store = SessionStore(shards=1)
+    store.initialize("s1")
+    turn = store.get("s1")
+    assert store.mark_callback_delivered("s1")
+    turn.totalMessagesExchanged += 2
+    turn.terminated = True
+    store.upsert(turn)
+
+    state = store.get("s1")
+    assert state.finalCallbackDelivered
+    assert state.totalMessagesExchanged == 2
+    assert store.stats()["finished"] == 1
+
+
+def test_mark_unknown_session():
+    assert not SessionStore().mark_callback_delivered("missing")
@@ -0,0 +1,185 @@
+import sqlite3
+
+import pytest
+
+from app.detector import update_session_score
+from app.models import DetectorResult
+from app.store_sqlite import SharedSessionStore, SQLiteSessionStore
+
+
+def _turn(state, indicators):
+    state.totalMessagesExchanged += 1
+    result = DetectorResult(score=0.3, indicators=indicators, weights={name: 0.1 for name in indicators})
+    state.scamScore = max(state.scamScore, update_session_score(state, result))
+    state.totalMessagesExchanged += 1
+
+
+def test_sessions_survive_restart(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path)
+    state = store.initialize("s1")
+    state.totalMessagesExchanged = 3
+    state.extractedIntelligence.upiIds.append("x@okaxis")
+    store.upsert(state)
+    store.close()
+
+    reopened = SQLiteSessionStore(path)
+    try:
+        state = reopened.get("s1")
+        assert state.totalMessagesExchanged == 3
+        assert state.extractedIntelligence.upiIds == ["x@okaxis"]
+        assert reopened.stats()["dbReads"] == 1
+    finally:
+        reopened.close()
+
+
+def test_cache_miss_reads_latest_state(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), shards=1, max_sessions=1)
+    try:
+        state = store.initialize("a")
+        state.totalMessagesExchanged = 5
+        store.upsert(state)
+        store.initialize("b")
+        assert store.get("a").totalMessagesExchanged == 5
+    finally:
+        store.close()
+
+
+def test_sweep_deletes_idle_rows_on_the_writer(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path, ttl_seconds=60)
+    try:
+        store.initialize("old")
+        store.initialize("new")
+        assert store.flush()
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE sessions SET updated_at = 0 WHERE session_id = 'old'")
+        # The delete is queued for the writer thread, so readers stay free.
+        with store._read_lock:
+            store.sweep()
+        assert store.flush()
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("SELECT session_id FROM sessions").fetchall() == [("new",)]
+    finally:
+        store.close()
+
+
+def test_conflicting_writes_are_merged(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first = SharedSessionStore(path)
+    second = SharedSessionStore(path)
+    first.initialize("s1")
+
+    ours = first.get("s1")
+    theirs = second.get("s1")
+    ours.extractedIntelligence.upiIds.append("a@okaxis")
+    theirs.extractedIntelligence.upiIds.append("b@okaxis")
+    theirs.scamConfirmed = True
+    second.upsert(theirs)
+    first.upsert(ours)
+
+    merged = first.get("s1")
+    assert sorted(merged.extractedIntelligence.upiIds) == ["a@okaxis", "b@okaxis"]
+    assert merged.scamConfirmed
+    assert first.conflicts == 1
+
+
+def test_initialize_keeps_existing_row(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first = SharedSessionStore(path)
+    state = first.initialize("s1")
+    state.totalMessagesExchanged = 2
+    first.upsert(state)
+    assert SharedSessionStore(path).initialize("s1").totalMessagesExchanged == 2
+
+
+def test_concurrent_turns_keep_both_increments(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first = SharedSessionStore(path)
+    second = SharedSessionStore(path)
+    first.initialize("s1")
+
+    ours = first.get("s1")
+    theirs = second.get("s1")
+    _turn(ours, ["otp", "url"])
+    _turn(theirs, ["otp"])
+    second.upsert(theirs)
+    first.upsert(ours)
+
+    merged = first.get("s1")
+    assert merged.totalMessagesExchanged == 4
+    assert merged.indicatorCounts == {"otp": 2, "url": 1}
+    assert merged.scamScore == pytest.approx(0.225)
+    assert [event.turn for event in merged.scoreTimeline] == [1, 3]
+    assert first.conflicts == 1
+
+
+def test_repeated_conflicts_count_each_write_once(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    stores = [SharedSessionStore(path) for _ in range(3)]
+    stores[0].initialize("s1")
+    states = [store.get("s1") for store in stores]
+    for state in states:
+        _turn(state, ["kyc"])
+    for store, state in zip(stores, states):
+        store.upsert(state)
+
+    merged = stores[0].get("s1")
+    assert merged.totalMessagesExchanged == 6
+    assert merged.indicatorCounts == {"kyc": 3}
+    assert merged.scamScore == pytest.approx(0.15)
+    assert sorted(event.turn for event in merged.scoreTimeline) == [1, 3, 5]
+
+
+def test_upsert_without_conflict_writes_state(tmp_path):
+    store = SharedSessionStore(str(tmp_path / "sessions.db"))
+    state = store.initialize("s1")
+    _turn(state, [])
+    store.upsert(state)
+    state = store.get("s1")
+    _turn(state, [])
+    store.upsert(state)
+    assert store.get("s1").totalMessagesExchanged == 4
+    assert store.conflicts == 0
+
+
+def test_stale_turn_keeps_delivered_flag_in_shared_store(tmp_path):
+    store = SharedSessionStore(str(tmp_path / "sessions.db"))
+    store.initialize("s1")
+    turn = store.get("s1")
+    assert store.mark_callback_delivered("s1")
+    _turn(turn, ["otp"])
+    store.upsert(turn)
+    state = store.get("s1")
+    assert state.finalCallbackDelivered
+    assert state.totalMessagesExchanged == 2
+
+
+def test_stale_turn_keeps_delivered_flag_in_sqlite_store(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path)
+    store.initialize("s1")
+    turn = store.get("s1")
+    assert store.mark_callback_delivered("s1")
+    store.flush()
+    _turn(turn, ["otp"])
+    store.upsert(turn)
+    assert store.get("s1").finalCallbackDelivered
+    store.close()
+
+    reopened = SQLiteSessionStore(path)
+    try:
+        state = reopened.get("s1")
+        assert state.finalCallbackDelivered
+        assert state.totalMessagesExchanged == 2
+    finally:
+        reopened.close()
+
+
+def test_mark_unknown_session(tmp_path):
+    assert not SharedSessionStore(str(tmp_path / "a.db")).mark_callback_delivered("missing")
+    store = SQLiteSessionStore(str(tmp_path / "b.db"))
+    try:
+        assert not store.mark_callback_delivered("missing")
+    finally:
+        store.close()